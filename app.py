@@ -1,7 +1,24 @@
+import time
+
+import pandas as pd
 import streamlit as st
-from math import log
-from joblib import load
-import numpy as np
+
+from utilities.instrumentation import METRICS, export_metrics, timer
+from utilities.serving_utilities import build_feature_matrix, load_popularity_model, what_if_curves
+
+# streamlit reruns this whole script on every interaction. each rerun is timed (model load, prediction, what-if curves,
+# rendering, total), and the process-wide metrics are written to $POPULARITY_METRICS_PATH at the end of the rerun.
+rerun_start = time.perf_counter()
+
+# labels of the what-if curves, in the same order as the widgets
+WHAT_IF_LABELS = [
+    ('followers', '# of Spotify Followers'),
+    ('danceability', 'Danceability'),
+    ('energy', 'Energy'),
+    ('speechiness', 'Speechiness'),
+    ('valence', 'Valence'),
+    ('mode', 'Mode')
+]
 
 # MAIN PAGE
 
@@ -24,7 +41,6 @@ st.text('')
 # widgets for user to select values for features
 followers = st.slider('# of Spotify Followers (max. 1 million)', min_value=1000, max_value=1000000,
                       value=500000, step=1000)
-log_followers = log(followers)
 
 danceability = st.slider('Danceability', min_value=0.0, max_value=1.0, value=0.5, step=0.01)
 energy = st.slider('Energy', min_value=0.0, max_value=1.0, value=0.5, step=0.01)
@@ -36,12 +52,31 @@ mode_label = st.radio('Mode', ('Major Key', 'Minor Key'))
 mode = 1 if mode_label == 'Major Key' else 0
 
 # predict popularity
-model = load('data/final_model.pkl')
-features = np.array([mode, danceability, energy, speechiness, valence, log_followers])
-popularity = model.predict(features.reshape(1, -1))
+# pure-NumPy scorer exported from data/final_model.pkl, loaded once per process rather than on every rerun
+with timer('app.load_model'):
+    model = load_popularity_model('data/final_model_coefficients.json')
+with timer('app.predict'):
+    features = build_feature_matrix(mode, danceability, energy, speechiness, valence, followers)
+    popularity = model.predict(features)
 popularity_display.progress(int(popularity[0]))
 popularity_number.subheader(f'{int(popularity[0])}')
 
+# what-if curves, showing how popularity changes as each option is varied with the others held at their current
+# values. every point of every curve is predicted in one call, and memoized by the (rounded) current values.
+st.text('')
+st.markdown('#### What if?')
+st.markdown('How the predicted popularity changes when one option is varied and the others stay as selected above.')
+with timer('app.what_if_curves'):
+    curves = what_if_curves(model, mode, danceability, energy, speechiness, valence, followers)
+with timer('app.render_what_if'):
+    for name, label in WHAT_IF_LABELS:
+        values, curve_popularity = curves[name]
+        st.text(label)
+        if name == 'mode':
+            st.bar_chart(pd.DataFrame({'Popularity': curve_popularity}, index=['Minor Key', 'Major Key']))
+        else:
+            st.line_chart(pd.DataFrame({'Popularity': curve_popularity}, index=pd.Index(values, name=label)))
+
 st.text('')
 st.text('Created by Stephen Kaplan')
 st.markdown('https://github.com/stephenjkaplan/song-popularity-predictor')
@@ -80,4 +115,7 @@ st.sidebar.markdown('**Energy** represents a perceptual measure of intensity and
 st.sidebar.markdown('**Speechiness** represents the presence of spoken words in a track.')
 st.sidebar.markdown('**Valence** describes the musical positiveness/happiness/cheerfulness conveyed by a '
                     'track.')
-st.sidebar.markdown('**Mode** determines if the song is in a major or minor key.')
\ No newline at end of file
+st.sidebar.markdown('**Mode** determines if the song is in a major or minor key.')
+
+METRICS.observe('app.rerun', time.perf_counter() - rerun_start)
+export_metrics(source='app')
@@ -0,0 +1,10 @@
+"""
+Scores a CSV or Parquet file of tracks with the popularity model, streaming it in fixed-size chunks.
+
+Usage: python batch_score.py tracks.csv predictions.csv [--chunk-size 100000] [--id-columns "Track URI"]
+"""
+from utilities.serving_utilities import main
+
+
+if __name__ == '__main__':
+    main()
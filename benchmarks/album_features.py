@@ -0,0 +1,62 @@
+"""
+Benchmarks album-level feature aggregation: applying `generate_spotify_album_features` to each album (as done in
+`Data Acquisition & Cleaning.ipynb`) versus the single-pass `generate_all_spotify_album_features`.
+
+Usage: python -m benchmarks.album_features [num_tracks]
+"""
+import sys
+import time
+import pandas as pd
+
+from benchmarks.synthetic_data import make_track_table
+from utilities.data_acquisition_utilities import generate_spotify_album_features, generate_all_spotify_album_features
+
+
+def per_album_album_features(df_tracks):
+    """
+    Aggregates album features the way `Data Acquisition & Cleaning.ipynb` does, one album at a time.
+
+    :param pandas.DataFrame df_tracks: Track-level data.
+    :return: Album-level metrics.
+    :rtype: pandas.DataFrame
+    """
+    df_album_features = (
+        df_tracks
+        .groupby(['Album Title', 'Artist'], as_index=False)
+        .apply(generate_spotify_album_features)
+    ).reset_index(drop=True)
+
+    return df_album_features
+
+
+def run(num_tracks=100000):
+    """
+    Times both aggregation paths on a synthetic track table, checks that they agree, and prints the results.
+
+    :param int num_tracks: Number of synthetic tracks.
+    :return: Seconds taken by the per-album and single-pass paths.
+    :rtype: dict
+    """
+    df_tracks = make_track_table(num_tracks)
+    num_albums = df_tracks.groupby(['Album Title', 'Artist']).ngroups
+    print(f'Aggregating {num_tracks} tracks over {num_albums} albums...')
+
+    start = time.perf_counter()
+    df_per_album = per_album_album_features(df_tracks)
+    per_album_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df_single_pass = generate_all_spotify_album_features(df_tracks)
+    single_pass_seconds = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(df_per_album.reset_index(drop=True), df_single_pass.reset_index(drop=True),
+                                  check_dtype=False)
+
+    print(f'Per-album:   {per_album_seconds:.3f}s')
+    print(f'Single pass: {single_pass_seconds:.3f}s ({per_album_seconds / single_pass_seconds:.0f}x faster)')
+
+    return {'per_album': per_album_seconds, 'single_pass': single_pass_seconds}
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,64 @@
+"""
+Contains an in-process stand-in for `spotipy.Spotify` backed by a synthetic catalog, so that the Spotify acquisition
+functions can be benchmarked without network access or credentials.
+"""
+import time
+from collections import Counter
+
+from spotipy.client import SpotifyException
+
+
+class FakeSpotifyClient:
+    """
+    Implements the subset of the `spotipy.Spotify` interface used by `data_acquisition_utilities`, enforcing the same
+    per-request ID limits as the real API. Counts calls per endpoint, and can optionally add latency to each call.
+    """
+
+    def __init__(self, catalog, latency=0.0):
+        """
+        :param benchmarks.synthetic_data.SyntheticCatalog catalog: Catalog to serve.
+        :param float latency: Seconds to sleep in every call, to simulate network round trips.
+        """
+        self.catalog = catalog
+        self.latency = latency
+        self.calls = Counter()
+
+    def _call(self, endpoint, num_ids=None, max_ids=None):
+        self.calls[endpoint] += 1
+        if max_ids is not None and num_ids > max_ids:
+            raise SpotifyException(400, -1, f'Too many ids requested for {endpoint}: {num_ids} > {max_ids}')
+        if self.latency:
+            time.sleep(self.latency)
+
+    def search(self, q, limit=10, offset=0, type='track', market=None):
+        self._call('search')
+        if type == 'album':
+            return self.catalog.search_albums(q, limit=limit)
+        if type == 'artist':
+            return self.catalog.search_artists(q, limit=limit)
+
+        raise NotImplementedError('The fake client only supports album and artist searches.')
+
+    def album_tracks(self, album_id, limit=50, offset=0, market=None):
+        self._call('album_tracks')
+        return self.catalog.album_tracks(album_id, limit=limit, offset=offset)
+
+    def albums(self, albums, market=None):
+        self._call('albums', len(albums), 20)
+        return {'albums': [self.catalog.album(album_id) for album_id in albums]}
+
+    def audio_features(self, tracks=[]):
+        self._call('audio_features', len(tracks), 100)
+        return [self.catalog.track_audio_features(track_id) for track_id in tracks]
+
+    def tracks(self, tracks, market=None):
+        self._call('tracks', len(tracks), 50)
+        return {'tracks': [self.catalog.track(track_id) for track_id in tracks]}
+
+    def artist_albums(self, artist_id, album_type=None, country=None, limit=20, offset=0):
+        self._call('artist_albums', limit, 50)
+        return self.catalog.artist_albums(artist_id, limit=limit, offset=offset)
+
+    def artists(self, artists):
+        self._call('artists', len(artists), 50)
+        return {'artists': [self.catalog.artist(artist_id) for artist_id in artists]}
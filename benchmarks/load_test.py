@@ -0,0 +1,186 @@
+"""
+Contains an end-to-end load test of the acquisition pipeline against the local Spotify/Pitchfork simulator
+(`benchmarks/simulator.py`). Requests go through real HTTP clients, connection pools and retries, so this measures
+throughput at realistic scale (10k-100k albums) and behavior under latency, server errors and throttling.
+
+Usage:
+    python -m benchmarks.load_test --num-albums 10000 --latency 0.02 --error-rate 0.01 --requests-per-second 500
+    python -m benchmarks.load_test --num-albums 100000 --stages audio_features_batched popularity
+"""
+import re
+import time
+import argparse
+
+from benchmarks.simulator import ServiceSimulator, simulator_spotify_client
+from benchmarks.synthetic_data import SyntheticCatalog
+from utilities.album_index import ArtistDiscographyIndex
+from utilities.data_acquisition_utilities import (NEW_REVIEW_LINKS_SCRIPT, SCROLL_TO_BOTTOM_SCRIPT, create_http_session,
+                                                  get_pitchfork_album_ratings_for_genre,
+                                                  get_spotify_track_audio_features,
+                                                  get_spotify_track_audio_features_batched,
+                                                  get_spotify_track_popularity_and_artist_followers)
+
+
+STAGES = ['pitchfork', 'audio_features', 'audio_features_batched', 'audio_features_indexed', 'popularity']
+
+REVIEW_LINK_PATTERN = re.compile(r'class="review__link" href="([^"]+)"')
+
+
+class SimulatorDriver:
+    """
+    Stands in for a Selenium web driver on the simulator's Pitchfork listing pages, without a browser. Runs the scripts
+    the scraper executes: scrolling to the bottom of the page loads the next fragment of reviews over HTTP, like the
+    page's infinite scroll script would, and review links are read from the fragments loaded so far.
+    """
+
+    def __init__(self, session):
+        """
+        :param requests.Session session: HTTP session to fetch pages with.
+        """
+        self.session = session
+        self._url = None
+        self._num_pages = 0
+        self._fragment_links = []
+
+    def _load(self, url):
+        response = self.session.get(url, timeout=30)
+        response.raise_for_status()
+        self._num_pages += 1
+        # the simulator serves one fragment of reviews per page
+        links = REVIEW_LINK_PATTERN.findall(response.text)
+        if links:
+            self._fragment_links.append(links)
+
+    def get(self, url):
+        self._url = url
+        self._num_pages = 0
+        self._fragment_links = []
+        self._load(url)
+
+    def execute_script(self, script, *args):
+        if script == SCROLL_TO_BOTTOM_SCRIPT:
+            self._load(f'{self._url}&page={self._num_pages + 1}')
+        elif script == NEW_REVIEW_LINKS_SCRIPT:
+            num_fragments = args[0]
+            return [len(self._fragment_links),
+                    [link for links in self._fragment_links[num_fragments:] for link in links]]
+        else:
+            raise NotImplementedError('The simulator driver only runs the scraper\'s scripts.')
+
+    def quit(self):
+        pass
+
+
+def run_stage(name, simulator, function, num_items):
+    """
+    Runs and times one stage of the pipeline, reporting throughput and the simulator's request counts.
+
+    :param str name: Name of the stage.
+    :param benchmarks.simulator.ServiceSimulator simulator: Simulator the stage makes requests to.
+    :param callable function: Function without arguments that runs the stage and returns its results.
+    :param int num_items: Number of items (albums or tracks) the stage processes.
+    :return: Results of the stage.
+    """
+    before = simulator.stats()['total']
+    start = time.perf_counter()
+    results = function()
+    seconds = time.perf_counter() - start
+    after = simulator.stats()['total']
+
+    requests, errors, throttled = (after[key] - before[key] for key in ('requests', 'errors', 'throttled'))
+    print(f'{name:<25} {seconds:>9.2f}s {num_items / seconds:>10,.1f} items/s {len(results):>9,} results '
+          f'{requests:>9,} requests {errors:>7,} errors {throttled:>7,} throttled')
+
+    return results
+
+
+def run_load_test(catalog, simulator, stages=STAGES, max_workers=8, genres=None):
+    """
+    Runs the selected pipeline stages against a running simulator.
+
+    :param benchmarks.synthetic_data.SyntheticCatalog catalog: Catalog served by the simulator.
+    :param benchmarks.simulator.ServiceSimulator simulator: Running simulator.
+    :param list stages: Stages to run, any of STAGES.
+    :param int max_workers: Number of concurrent requests for the stages that make them concurrently.
+    :param list genres: Genres to scrape from Pitchfork. Defaults to every genre in the catalog.
+    """
+    session = create_http_session(pool_size=max_workers)
+    client = simulator_spotify_client(simulator.url, session=session)
+    album_names = [review['album'] for review in catalog.reviews]
+    artist_names = [review['artist'] for review in catalog.reviews]
+
+    if 'pitchfork' in stages:
+        genres = genres or sorted({review['genre'] for review in catalog.reviews})
+        driver = SimulatorDriver(session)
+
+        def scrape_pitchfork():
+            album_ratings = []
+            for genre in genres:
+                num_albums = sum(review['genre'] == genre for review in catalog.reviews)
+                df_album_ratings_genre = get_pitchfork_album_ratings_for_genre(driver, genre, num_albums,
+                                                                               max_workers=max_workers,
+                                                                               requests_per_second=None,
+                                                                               session=session,
+                                                                               pitchfork_url=simulator.url)
+                album_ratings.extend(df_album_ratings_genre.to_dict('records'))
+            return album_ratings
+
+        run_stage('pitchfork', simulator, scrape_pitchfork, len(catalog.reviews))
+
+    df_tracks = None
+    if 'audio_features' in stages:
+        df_tracks = run_stage('audio_features', simulator,
+                              lambda: get_spotify_track_audio_features(client, album_names, artist_names),
+                              len(album_names))
+    if 'audio_features_batched' in stages:
+        df_tracks = run_stage('audio_features_batched', simulator,
+                              lambda: get_spotify_track_audio_features_batched(client, album_names, artist_names,
+                                                                               max_workers=max_workers),
+                              len(album_names))
+    if 'audio_features_indexed' in stages:
+        album_index = ArtistDiscographyIndex(client)
+        df_tracks = run_stage('audio_features_indexed', simulator,
+                              lambda: get_spotify_track_audio_features_batched(client, album_names, artist_names,
+                                                                               max_workers=max_workers,
+                                                                               album_index=album_index),
+                              len(album_names))
+        print(f'{"":<25} album index: {album_index.stats()}')
+    if 'popularity' in stages:
+        track_uris = list(df_tracks['Track URI']) if df_tracks is not None else \
+            [track['uri'] for track in catalog.tracks.values()]
+        run_stage('popularity', simulator,
+                  lambda: get_spotify_track_popularity_and_artist_followers(client, track_uris), len(track_uris))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the acquisition pipeline against a local simulator.')
+    parser.add_argument('--num-albums', type=int, default=10000, help='Number of albums in the synthetic catalog.')
+    parser.add_argument('--tracks-per-album', type=int, default=12, help='Number of tracks on each album.')
+    parser.add_argument('--title-variant-fraction', type=float, default=0.0,
+                        help='Fraction of albums whose Spotify title differs from their Pitchfork title.')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES, help='Pipeline stages to run.')
+    parser.add_argument('--max-workers', type=int, default=8, help='Number of concurrent requests.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to delay every response by.')
+    parser.add_argument('--latency-jitter', type=float, default=0.0, help='Maximum random seconds added to latency.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with a 503.')
+    parser.add_argument('--requests-per-second', type=float, help='Rate above which requests get 429 responses.')
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds of 429 responses.')
+    args = parser.parse_args(argv)
+
+    print(f'Generating catalog of {args.num_albums} albums...')
+    catalog = SyntheticCatalog(num_albums=args.num_albums, tracks_per_album=args.tracks_per_album,
+                               title_variant_fraction=args.title_variant_fraction)
+    with ServiceSimulator(catalog, latency=args.latency, latency_jitter=args.latency_jitter,
+                          error_rate=args.error_rate, requests_per_second=args.requests_per_second,
+                          retry_after=args.retry_after) as simulator:
+        print(f'Simulator running on {simulator.url}\n')
+        run_load_test(catalog, simulator, stages=args.stages, max_workers=args.max_workers)
+
+        print('\nRequests per endpoint:')
+        for endpoint, endpoint_stats in simulator.stats().items():
+            print(f"{endpoint:<25} {endpoint_stats['requests']:>9,} requests {endpoint_stats['errors']:>7,} errors "
+                  f"{endpoint_stats['throttled']:>7,} throttled")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Contains a load generator for the prediction service (`prediction_service.py`). Many concurrent clients send
+single-track prediction requests over keep-alive connections, and client-side throughput and latency percentiles are
+reported next to the service's own metrics.
+
+Usage:
+    python -m benchmarks.prediction_service_load                           # starts a service in-process
+    python -m benchmarks.prediction_service_load --url http://127.0.0.1:8000 --clients 64 --requests 500
+"""
+import json
+import time
+import argparse
+import threading
+import http.client
+from collections import Counter
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from utilities.prediction_service import PredictionService
+
+
+def run_client(url, num_requests, latencies, failures, random_state):
+    """
+    Sends prediction requests one after another over a single connection, recording each successful request's latency.
+    A failed request (an error status, or a connection error such as a reset) is recorded and the client carries on,
+    reconnecting if needed.
+
+    :param str url: Root URL of the prediction service.
+    :param int num_requests: Number of requests to send.
+    :param list latencies: List to append latencies (seconds) of successful requests to.
+    :param list failures: List to append a description of each failed request to.
+    :param int random_state: Seed for the random request inputs.
+    """
+    rng = np.random.RandomState(random_state)
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port)
+    try:
+        for _ in range(num_requests):
+            body = json.dumps({'mode': int(rng.randint(0, 2)), 'danceability': rng.uniform(), 'energy': rng.uniform(),
+                               'speechiness': rng.uniform(), 'valence': rng.uniform(),
+                               'followers': int(rng.randint(1000, 1000000))})
+            start = time.perf_counter()
+            try:
+                connection.request('POST', '/predict', body=body, headers={'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException) as e:
+                failures.append(f'{type(e).__name__}: {e}')
+                connection.close()      # the next request reconnects
+                continue
+            if response.status != 200:
+                failures.append(f'HTTP {response.status}')
+                continue
+            latencies.append(time.perf_counter() - start)
+    finally:
+        connection.close()
+
+
+def run_load(url, num_clients=32, requests_per_client=200):
+    """
+    Runs concurrent clients against a prediction service.
+
+    :param str url: Root URL of the prediction service.
+    :param int num_clients: Number of concurrent clients.
+    :param int requests_per_client: Number of requests each client sends.
+    :return: Client-side throughput, number and most common kinds of failed requests, and latency percentiles.
+    :rtype: dict
+    """
+    latencies, failures = [], []
+    clients = [threading.Thread(target=run_client, args=(url, requests_per_client, latencies, failures, i))
+               for i in range(num_clients)]
+    start = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    seconds = time.perf_counter() - start
+
+    return {
+        'requests': len(latencies),
+        'failed_requests': len(failures),
+        'failures': dict(Counter(failures).most_common(5)),
+        'seconds': seconds,
+        'requests_per_second': len(latencies) / seconds,
+        'latency_p50_ms': float(np.percentile(latencies, 50)) * 1000 if latencies else None,
+        'latency_p90_ms': float(np.percentile(latencies, 90)) * 1000 if latencies else None,
+        'latency_p99_ms': float(np.percentile(latencies, 99)) * 1000 if latencies else None
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the prediction service.')
+    parser.add_argument('--url', help='Root URL of a running prediction service. Defaults to starting one in-process.')
+    parser.add_argument('--clients', type=int, default=32, help='Number of concurrent clients.')
+    parser.add_argument('--requests', type=int, default=200, help='Number of requests per client.')
+    parser.add_argument('--max-batch-size', type=int, default=1024, help='Micro-batch size of an in-process service.')
+    parser.add_argument('--max-wait-ms', type=float, default=2.0, help='Micro-batch wait of an in-process service.')
+    args = parser.parse_args(argv)
+
+    service = None
+    url = args.url
+    if url is None:
+        service = PredictionService(port=0, max_batch_size=args.max_batch_size, max_wait=args.max_wait_ms / 1000)
+        url = service.start()
+
+    try:
+        print('Client side:')
+        print(json.dumps(run_load(url, num_clients=args.clients, requests_per_client=args.requests), indent=2))
+        connection = http.client.HTTPConnection(urlsplit(url).hostname, urlsplit(url).port)
+        connection.request('GET', '/metrics')
+        print('Service side:')
+        print(json.dumps(json.loads(connection.getresponse().read()), indent=2))
+        connection.close()
+    finally:
+        if service is not None:
+            service.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,444 @@
+"""
+Offline benchmark suite covering the serving, acquisition and modeling hot paths. Every benchmark runs against local
+data (the pickled model, synthetic tables, an in-process fake Spotify client and stored Pitchfork fixture pages), so
+results only reflect code and library changes, not the network.
+
+Results are written as JSON lines (one line per benchmark, tagged with the git commit and library versions), and can be
+compared against a previous run to flag regressions.
+
+Usage:
+    python -m benchmarks.run_benchmarks                              # run everything
+    python -m benchmarks.run_benchmarks --filter serving             # only benchmarks whose name contains 'serving'
+    python -m benchmarks.run_benchmarks --baseline benchmarks/results/<previous run>.jsonl --threshold 0.2
+"""
+import os
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+import statistics
+import contextlib
+from datetime import datetime, timezone
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'fixtures')
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+PICKLED_MODEL_PATH = os.path.join(ROOT_DIR, 'data', 'final_model.pkl')
+LINEAR_MODEL_PATH = os.path.join(ROOT_DIR, 'data', 'final_model_coefficients.json')
+
+# registered benchmarks: (name, setup function, number of items processed per call)
+BENCHMARKS = []
+
+
+def benchmark(name, items=1):
+    """
+    Registers a benchmark. The decorated function does any (untimed) setup and returns a function without arguments
+    whose execution is timed.
+
+    :param str name: Unique, dotted name of the benchmark, e.g. 'serving.predict.single_row'.
+    :param int items: Number of items (rows, albums, pages...) processed per call, used to report throughput.
+    """
+    def register(setup):
+        BENCHMARKS.append((name, setup, items))
+        return setup
+
+    return register
+
+
+# SERVING
+
+def _random_features(num_rows):
+    import numpy as np
+    from utilities.serving_utilities import build_feature_matrix
+
+    rng = np.random.RandomState(0)
+    return build_feature_matrix(rng.randint(0, 2, num_rows), rng.uniform(0, 1, num_rows), rng.uniform(0, 1, num_rows),
+                                rng.uniform(0, 1, num_rows), rng.uniform(0, 1, num_rows),
+                                rng.randint(1000, 1000000, num_rows))
+
+
+@benchmark('serving.predict.single_row.pickled_model')
+def _predict_single_row_pickled_model():
+    from joblib import load
+
+    model = load(PICKLED_MODEL_PATH)
+    features = _random_features(1)
+    return lambda: model.predict(features)
+
+
+@benchmark('serving.predict.single_row.linear_scorer')
+def _predict_single_row_linear_scorer():
+    from utilities.linear_scorer import LinearScorer
+
+    model = LinearScorer.load(LINEAR_MODEL_PATH)
+    features = _random_features(1)
+    return lambda: model.predict(features)
+
+
+@benchmark('serving.predict.batch_100k.pickled_model', items=100000)
+def _predict_batch_pickled_model():
+    from joblib import load
+
+    model = load(PICKLED_MODEL_PATH)
+    features = _random_features(100000)
+    return lambda: model.predict(features)
+
+
+@benchmark('serving.predict.batch_100k.linear_scorer', items=100000)
+def _predict_batch_linear_scorer():
+    from utilities.linear_scorer import LinearScorer
+
+    model = LinearScorer.load(LINEAR_MODEL_PATH)
+    features = _random_features(100000)
+    return lambda: model.predict(features)
+
+
+@benchmark('serving.what_if_curves.uncached', items=252)
+def _what_if_curves_uncached():
+    from utilities.linear_scorer import LinearScorer
+    from utilities.serving_utilities import _what_if_curves
+
+    model = LinearScorer.load(LINEAR_MODEL_PATH)
+    # bypass the memoization, which would otherwise make every call after the first a dictionary lookup
+    return lambda: _what_if_curves.__wrapped__(model, (1.0, 0.5, 0.5, 0.5, 0.5, 500000.0), 50)
+
+
+@benchmark('serving.build_features.batch_100k', items=100000)
+def _build_features_batch():
+    from benchmarks.synthetic_data import make_track_table
+    from utilities.serving_utilities import build_feature_matrix_from_frame
+
+    df_tracks = make_track_table(100000)
+    df_tracks['Artist Followers'] = 500000
+    return lambda: build_feature_matrix_from_frame(df_tracks)
+
+
+# ACQUISITION
+
+@benchmark('acquisition.album_features.per_album', items=20000)
+def _album_features_per_album():
+    from benchmarks.album_features import per_album_album_features
+    from benchmarks.synthetic_data import make_track_table
+
+    df_tracks = make_track_table(20000)
+    return lambda: per_album_album_features(df_tracks)
+
+
+@benchmark('acquisition.album_features.single_pass', items=20000)
+def _album_features_single_pass():
+    from benchmarks.synthetic_data import make_track_table
+    from utilities.data_acquisition_utilities import generate_all_spotify_album_features
+
+    df_tracks = make_track_table(20000)
+    return lambda: generate_all_spotify_album_features(df_tracks)
+
+
+def _fake_spotify_albums(num_albums=200):
+    from benchmarks.fake_spotify import FakeSpotifyClient
+    from benchmarks.synthetic_data import SyntheticCatalog
+
+    catalog = SyntheticCatalog(num_albums=num_albums)
+    album_names = [review['album'] for review in catalog.reviews]
+    artist_names = [review['artist'] for review in catalog.reviews]
+    return FakeSpotifyClient(catalog), album_names, artist_names
+
+
+@benchmark('acquisition.spotify.audio_features', items=200)
+def _spotify_audio_features():
+    from utilities.data_acquisition_utilities import get_spotify_track_audio_features
+
+    client, album_names, artist_names = _fake_spotify_albums()
+    return lambda: get_spotify_track_audio_features(client, album_names, artist_names)
+
+
+@benchmark('acquisition.spotify.audio_features_batched', items=200)
+def _spotify_audio_features_batched():
+    from utilities.data_acquisition_utilities import get_spotify_track_audio_features_batched
+
+    client, album_names, artist_names = _fake_spotify_albums()
+    return lambda: get_spotify_track_audio_features_batched(client, album_names, artist_names)
+
+
+@benchmark('acquisition.spotify.audio_features_indexed', items=200)
+def _spotify_audio_features_indexed():
+    from utilities.album_index import ArtistDiscographyIndex
+    from utilities.data_acquisition_utilities import get_spotify_track_audio_features_batched
+
+    client, album_names, artist_names = _fake_spotify_albums()
+    # a new index per call, so every call resolves artists from scratch like a fresh run would
+    return lambda: get_spotify_track_audio_features_batched(client, album_names, artist_names,
+                                                            album_index=ArtistDiscographyIndex(client))
+
+
+@benchmark('acquisition.spotify.popularity_and_followers', items=2400)
+def _spotify_popularity_and_followers():
+    from utilities.data_acquisition_utilities import get_spotify_track_popularity_and_artist_followers
+
+    client, _, _ = _fake_spotify_albums()
+    track_uris = [track['uri'] for track in client.catalog.tracks.values()]
+    return lambda: get_spotify_track_popularity_and_artist_followers(client, track_uris)
+
+
+class _FixtureResponse:
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+class _FixtureSession:
+    """
+    Stands in for `requests.Session`, answering every request with the same stored page.
+    """
+
+    def __init__(self, text):
+        self.response = _FixtureResponse(text)
+
+    def get(self, url, timeout=None):
+        return self.response
+
+
+class _FixtureDriver:
+    """
+    Stands in for a Selenium web driver that has already loaded a stored page.
+    """
+
+    def __init__(self, page_source):
+        self.page_source = page_source
+
+
+def _read_fixture(file_name):
+    with open(os.path.join(FIXTURES_DIR, file_name), encoding='utf-8') as f:
+        return f.read()
+
+
+@benchmark('acquisition.pitchfork.parse_album_rating')
+def _parse_album_rating():
+    from utilities.data_acquisition_utilities import get_album_rating
+
+    session = _FixtureSession(_read_fixture('pitchfork_review.html'))
+    return lambda: get_album_rating('https://pitchfork.com/reviews/albums/fixture/', 'Rock', session=session)
+
+
+@benchmark('acquisition.pitchfork.parse_album_review_urls', items=240)
+def _parse_album_review_urls():
+    from utilities.data_acquisition_utilities import get_album_review_urls
+
+    driver = _FixtureDriver(_read_fixture('pitchfork_listing.html'))
+    return lambda: get_album_review_urls(driver, 240)
+
+
+# MODELING
+
+def _synthetic_training_data(num_rows=20000):
+    import numpy as np
+    import pandas as pd
+
+    features = _random_features(num_rows)
+    X = pd.DataFrame(features, columns=['Mode', 'Danceability', 'Energy', 'Speechiness', 'Valence',
+                                        'Log Artist Followers'])
+    y = pd.Series(features @ np.array([-0.5, 10, -5, -4, 3, 5.5]) + np.random.RandomState(1).normal(0, 14, num_rows))
+    return X, y
+
+
+@benchmark('modeling.manual_cross_validate', items=5)
+def _manual_cross_validate():
+    from sklearn.linear_model import Lasso
+    from utilities.modeling_utilities import manual_cross_validate
+
+    X, y = _synthetic_training_data()
+
+    def run():
+        # manual_cross_validate reports by printing, which shouldn't be part of the measurement
+        with contextlib.redirect_stdout(io.StringIO()):
+            manual_cross_validate(X, y, Lasso(alpha=0.03), cv=5)
+
+    return run
+
+
+@benchmark('modeling.lasso_path_search', items=100)
+def _lasso_path_search():
+    from utilities.modeling_utilities import lasso_path_search
+
+    X, y = _synthetic_training_data()
+    return lambda: lasso_path_search(X, y, n_alphas=100, cv=5, random_state=0)
+
+
+def time_function(function, repeat=5, min_seconds=0.2):
+    """
+    Times a function like `timeit`: calls it in loops long enough to be measured accurately, `repeat` times.
+
+    :param callable function: Function without arguments.
+    :param int repeat: Number of timed loops.
+    :param float min_seconds: Minimum duration of each loop; determines the number of calls per loop.
+    :return: Number of calls per loop, and the seconds per call of each loop.
+    :rtype: tuple
+    """
+    # calibrate, which also warms up caches and lazy imports
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            break
+        loops *= 10 if elapsed < min_seconds / 10 else 2
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        timings.append((time.perf_counter() - start) / loops)
+
+    return loops, timings
+
+
+def run_benchmarks(name_filter=None, repeat=5, min_seconds=0.2):
+    """
+    Runs every registered benchmark whose name contains `name_filter`.
+
+    :param str name_filter: Substring of benchmark names to run. Defaults to all benchmarks.
+    :param int repeat: Number of timed loops per benchmark.
+    :param float min_seconds: Minimum duration of each loop.
+    :return: One result per benchmark.
+    :rtype: list
+    """
+    results = []
+    for name, setup, items in BENCHMARKS:
+        if name_filter and name_filter not in name:
+            continue
+
+        loops, timings = time_function(setup(), repeat=repeat, min_seconds=min_seconds)
+        median = statistics.median(timings)
+        results.append({
+            'name': name,
+            'median_seconds': median,
+            'min_seconds': min(timings),
+            'mean_seconds': statistics.mean(timings),
+            'stdev_seconds': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+            'items_per_second': items / median,
+            'loops': loops,
+            'repeat': repeat
+        })
+        print(f'{name:<55} {_format_seconds(median):>10} per call  {items / median:>14,.0f} items/s')
+
+    return results
+
+
+def _format_seconds(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.2f}{unit}'
+    return f'{seconds / 1e-9:.0f}ns'
+
+
+def run_metadata():
+    """
+    :return: Information identifying the environment and code version a run was made with.
+    :rtype: dict
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    versions = {}
+    for package in ('numpy', 'pandas', 'sklearn', 'bs4'):
+        try:
+            versions[package] = __import__(package).__version__
+        except ImportError:
+            versions[package] = None
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'versions': versions
+    }
+
+
+def write_results(results, path):
+    """
+    Writes results as JSON lines, each tagged with the run's metadata.
+
+    :param list results: Results from `run_benchmarks`.
+    :param str path: Path to .jsonl file.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    metadata = run_metadata()
+    with open(path, 'w') as f:
+        for result in results:
+            f.write(json.dumps(dict(result, **metadata)) + '\n')
+
+
+def read_results(path):
+    """
+    :param str path: Path to .jsonl file written by `write_results`.
+    :return: Results by benchmark name.
+    :rtype: dict
+    """
+    with open(path) as f:
+        return {result['name']: result for result in map(json.loads, f) if result}
+
+
+def find_regressions(results, baseline, threshold=0.2):
+    """
+    Compares results with a baseline run.
+
+    :param list results: Results from `run_benchmarks`.
+    :param dict baseline: Baseline results by benchmark name, from `read_results`.
+    :param float threshold: Relative slowdown of the median time that counts as a regression (0.2 = 20% slower).
+    :return: (name, baseline median, new median, relative change) of every regressed benchmark.
+    :rtype: list
+    """
+    regressions = []
+    for result in results:
+        baseline_result = baseline.get(result['name'])
+        if baseline_result is None:
+            continue
+
+        change = result['median_seconds'] / baseline_result['median_seconds'] - 1
+        marker = 'REGRESSION' if change > threshold else ''
+        print(f"{result['name']:<55} {change:>+8.1%} {marker}")
+        if change > threshold:
+            regressions.append((result['name'], baseline_result['median_seconds'], result['median_seconds'], change))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the offline benchmark suite.')
+    parser.add_argument('--filter', help='Only run benchmarks whose name contains this string.')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of timed loops per benchmark.')
+    parser.add_argument('--min-seconds', type=float, default=0.2, help='Minimum duration of each timed loop.')
+    parser.add_argument('--output', help='Path to write JSON lines results to. Defaults to benchmarks/results/.')
+    parser.add_argument('--baseline', help='Results of a previous run to compare against.')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Relative slowdown that counts as a regression (default 0.2 = 20%%).')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.filter, repeat=args.repeat, min_seconds=args.min_seconds)
+
+    output_path = args.output or os.path.join(RESULTS_DIR,
+                                              f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.jsonl")
+    write_results(results, output_path)
+    print(f'\nWrote results to {output_path}')
+
+    if args.baseline:
+        print(f'\nComparing with {args.baseline}:')
+        regressions = find_regressions(results, read_results(args.baseline), threshold=args.threshold)
+        if regressions:
+            print(f'\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}.')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
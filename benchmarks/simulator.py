@@ -0,0 +1,397 @@
+"""
+Contains a local HTTP server that stands in for the Spotify Web API and pitchfork.com, serving a synthetic catalog, so
+that the acquisition pipeline can be load tested end to end (real HTTP clients, connection pools, retries) without
+touching the real services. Latency, server errors and 429 rate-limit responses can be injected.
+
+Run it standalone with e.g.:
+    python -m benchmarks.simulator --num-albums 10000 --latency 0.05 --error-rate 0.01 --requests-per-second 100
+and point a Spotify client at it with `simulator_spotify_client`, and the Pitchfork scrapers at it with their
+`pitchfork_url` parameter.
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from benchmarks.synthetic_data import SyntheticCatalog, GENRES
+
+
+# maximum number of IDs per request accepted by Spotify's batch endpoints
+ID_LIMITS = {'albums': 20, 'audio_features': 100, 'tracks': 50, 'artists': 50}
+
+# genres as they appear in Pitchfork listing URLs, see `get_pitchfork_album_ratings_for_genre`
+GENRES_BY_SLUG = {genre.lower().split('/')[0]: genre for genre in GENRES}
+
+REVIEWS_PER_FRAGMENT = 12
+
+# appended to listing pages so that scrolling to the bottom in a real browser loads the next fragment, like
+# pitchfork.com's infinite scroll
+INFINITE_SCROLL_SCRIPT = '''<script>
+var nextPage = 2, loading = false;
+window.addEventListener('scroll', function () {
+  if (loading || window.innerHeight + window.scrollY < document.body.scrollHeight - 10) { return; }
+  loading = true;
+  fetch(window.location.pathname + window.location.search + '&page=' + nextPage)
+    .then(function (response) { return response.text(); })
+    .then(function (html) {
+      document.querySelector('.fragment-list').insertAdjacentHTML('beforeend', html);
+      nextPage += 1;
+      loading = false;
+    });
+});
+</script>
+'''
+
+
+class ServiceSimulator:
+    """
+    Threaded HTTP server for a synthetic catalog, implementing the Spotify endpoints used by `data_acquisition_utilities`
+    and `album_index` (search, album tracks, albums, audio features, tracks, artists, artist albums) under `/v1/`, and
+    Pitchfork's album review listing (`/reviews/albums/?genre=<genre>&page=<page>`) and review pages
+    (`/reviews/albums/<slug>/`).
+
+    Every request is delayed by `latency` (plus up to `latency_jitter`), fails with a 503 with probability `error_rate`,
+    and is answered with a 429 and a Retry-After header once more than `requests_per_second` arrive per second.
+    """
+
+    def __init__(self, catalog, latency=0.0, latency_jitter=0.0, error_rate=0.0, requests_per_second=None,
+                 retry_after=1, host='127.0.0.1', port=0, random_state=0):
+        """
+        :param benchmarks.synthetic_data.SyntheticCatalog catalog: Catalog to serve.
+        :param float latency: Seconds to delay every response by.
+        :param float latency_jitter: Maximum random seconds added to `latency`.
+        :param float error_rate: Fraction of requests answered with a 503 error.
+        :param float requests_per_second: Sustained request rate above which requests get 429 responses. Bursts of up
+                                          to one second's worth of requests are allowed. None disables rate limiting.
+        :param int retry_after: Seconds sent in the Retry-After header of 429 responses.
+        :param str host: Interface to listen on.
+        :param int port: Port to listen on. 0 picks a free port.
+        :param int random_state: Seed for latency jitter and injected errors.
+        """
+        self.catalog = catalog
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.requests_per_second = requests_per_second
+        self.retry_after = retry_after
+
+        self.requests, self.errors, self.throttled = Counter(), Counter(), Counter()
+        self._random = random.Random(random_state)
+        self._lock = threading.Lock()
+        self._tokens = requests_per_second or 0.0
+        self._last_refill = time.monotonic()
+
+        self._reviews_by_slug = {review['slug']: review for review in catalog.reviews}
+        self._reviews_by_genre = {}
+        for review in catalog.reviews:
+            self._reviews_by_genre.setdefault(review['genre'], []).append(review)
+
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        :return: Root URL of the server, e.g. 'http://127.0.0.1:54321'.
+        :rtype: str
+        """
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """
+        Starts serving in a background thread.
+
+        :return: Root URL of the server.
+        :rtype: str
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+        return self.url
+
+    def serve_forever(self):
+        """
+        Serves requests in the calling thread until `stop` is called (from another thread).
+        """
+        self._server.serve_forever()
+
+    def stop(self):
+        """
+        Stops serving and closes the listening socket.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self):
+        """
+        :return: Number of requests, injected errors and throttled requests per endpoint, plus totals under 'total'.
+        :rtype: dict
+        """
+        with self._lock:
+            stats = {endpoint: {'requests': self.requests[endpoint], 'errors': self.errors[endpoint],
+                                'throttled': self.throttled[endpoint]}
+                     for endpoint in sorted(self.requests)}
+        stats['total'] = {key: sum(s[key] for s in stats.values()) for key in ('requests', 'errors', 'throttled')}
+
+        return stats
+
+    def _take_token(self):
+        """
+        Token bucket rate limiting: tokens refill at `requests_per_second` up to a burst of one second's worth.
+
+        :return: Whether the request is within the rate limit.
+        :rtype: bool
+        """
+        if not self.requests_per_second:
+            return True
+
+        now = time.monotonic()
+        self._tokens = min(self.requests_per_second,
+                           self._tokens + (now - self._last_refill) * self.requests_per_second)
+        self._last_refill = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+
+        return True
+
+    def handle(self, path, query):
+        """
+        Answers a GET request.
+
+        :param str path: Request path, e.g. '/v1/albums'.
+        :param dict query: Query parameters, as parsed by `urllib.parse.parse_qs`.
+        :return: Status code, extra headers, content type and body.
+        :rtype: tuple
+        """
+        endpoint, route, match = _route(path)
+
+        with self._lock:
+            self.requests[endpoint] += 1
+            if not self._take_token():
+                self.throttled[endpoint] += 1
+                return (429, {'Retry-After': str(self.retry_after)}, 'application/json',
+                        _spotify_error(429, 'API rate limit exceeded'))
+            delay = self.latency + self._random.uniform(0, self.latency_jitter)
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors[endpoint] += 1
+
+        if delay:
+            time.sleep(delay)
+        if failed:
+            return 503, {}, 'application/json', _spotify_error(503, 'Service unavailable')
+        if route is None:
+            return 404, {}, 'application/json', _spotify_error(404, 'Not found')
+
+        try:
+            return route(self, match, {key: values[-1] for key, values in query.items()})
+        except _RequestError as e:
+            return e.status, {}, 'application/json', _spotify_error(e.status, str(e))
+
+    # SPOTIFY
+
+    def _ids(self, endpoint, params):
+        ids = [self.catalog.parse_id(i) for i in params.get('ids', '').split(',') if i]
+        if not ids:
+            raise _RequestError(400, 'No ids provided')
+        if len(ids) > ID_LIMITS[endpoint]:
+            raise _RequestError(400, f'Too many ids requested: {len(ids)} > {ID_LIMITS[endpoint]}')
+        return ids
+
+    def _search(self, match, params):
+        limit = int(params.get('limit', 10))
+        if params.get('type') == 'album':
+            return _json(self.catalog.search_albums(params.get('q', ''), limit=limit))
+        if params.get('type') == 'artist':
+            return _json(self.catalog.search_artists(params.get('q', ''), limit=limit))
+        raise _RequestError(400, 'The simulator only supports album and artist searches')
+
+    def _album_tracks(self, match, params):
+        album_id = match.group('id')
+        if album_id not in self.catalog.albums:
+            raise _RequestError(404, 'Non existing id')
+        return _json(self.catalog.album_tracks(album_id, limit=int(params.get('limit', 50)),
+                                               offset=int(params.get('offset', 0))))
+
+    def _albums(self, match, params):
+        return _json({'albums': [self.catalog.album(i) for i in self._ids('albums', params)]})
+
+    def _audio_features(self, match, params):
+        return _json({'audio_features': [self.catalog.track_audio_features(i)
+                                          for i in self._ids('audio_features', params)]})
+
+    def _tracks(self, match, params):
+        return _json({'tracks': [self.catalog.track(i) for i in self._ids('tracks', params)]})
+
+    def _artist_albums(self, match, params):
+        artist_id = match.group('id')
+        if artist_id not in self.catalog.artists:
+            raise _RequestError(404, 'Non existing id')
+        limit = int(params.get('limit', 20))
+        if limit > 50:
+            raise _RequestError(400, 'Invalid limit')
+        return _json(self.catalog.artist_albums(artist_id, limit=limit, offset=int(params.get('offset', 0))))
+
+    def _artists(self, match, params):
+        return _json({'artists': [self.catalog.artist(i) for i in self._ids('artists', params)]})
+
+    # PITCHFORK
+
+    def _review_listing(self, match, params):
+        genre = GENRES_BY_SLUG.get(params.get('genre', ''))
+        reviews = self._reviews_by_genre.get(genre, []) if genre else self.catalog.reviews
+        page = int(params.get('page', 1))
+        start = (page - 1) * REVIEWS_PER_FRAGMENT
+        page_reviews = reviews[start:start + REVIEWS_PER_FRAGMENT]
+        if page > 1:
+            # later pages are fetched by the infinite scroll script, which only needs the new fragment
+            html = self.catalog.pitchfork_listing_fragment_html(page_reviews)
+        else:
+            html = self.catalog.pitchfork_listing_html(page_reviews, reviews_per_fragment=REVIEWS_PER_FRAGMENT)
+            html = html.replace('</body>', f'{INFINITE_SCROLL_SCRIPT}</body>')
+        return 200, {}, 'text/html; charset=utf-8', html
+
+    def _review(self, match, params):
+        review = self._reviews_by_slug.get(match.group('slug'))
+        if review is None:
+            return 404, {}, 'text/html; charset=utf-8', '<html><body><h1>Page not found</h1></body></html>'
+        return 200, {}, 'text/html; charset=utf-8', self.catalog.pitchfork_review_html(review)
+
+
+class _RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _json(response):
+    return 200, {}, 'application/json', json.dumps(response)
+
+
+def _spotify_error(status, message):
+    return json.dumps({'error': {'status': status, 'message': message}})
+
+
+# (endpoint name, path pattern, handler). trailing slashes are stripped before matching.
+ROUTES = [
+    ('search', re.compile(r'^/v1/search$'), ServiceSimulator._search),
+    ('album_tracks', re.compile(r'^/v1/albums/(?P<id>[^/]+)/tracks$'), ServiceSimulator._album_tracks),
+    ('albums', re.compile(r'^/v1/albums$'), ServiceSimulator._albums),
+    ('audio_features', re.compile(r'^/v1/audio-features$'), ServiceSimulator._audio_features),
+    ('tracks', re.compile(r'^/v1/tracks$'), ServiceSimulator._tracks),
+    ('artists', re.compile(r'^/v1/artists$'), ServiceSimulator._artists),
+    ('artist_albums', re.compile(r'^/v1/artists/(?P<id>[^/]+)/albums$'), ServiceSimulator._artist_albums),
+    ('pitchfork_listing', re.compile(r'^/reviews/albums$'), ServiceSimulator._review_listing),
+    ('pitchfork_review', re.compile(r'^/reviews/albums/(?P<slug>[^/]+)$'), ServiceSimulator._review),
+]
+
+
+def _route(path):
+    """
+    :param str path: Request path.
+    :return: Endpoint name, handler and path match. The handler and match are None for unknown paths.
+    :rtype: tuple
+    """
+    path = path.rstrip('/') or '/'
+    for endpoint, pattern, route in ROUTES:
+        match = pattern.match(path)
+        if match:
+            return endpoint, route, match
+
+    return 'unknown', None, None
+
+
+def _make_handler(simulator):
+    class Handler(BaseHTTPRequestHandler):
+        # keep connections alive, so clients can pool them like they would with the real services
+        protocol_version = 'HTTP/1.1'
+        # headers and body go out in separate writes. with Nagle's algorithm on, the body waits for the client's
+        # delayed ACK of the headers, adding ~40 ms to every response on a kept-alive connection
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            status, headers, content_type, body = simulator.handle(url.path, parse_qs(url.query))
+            body = body.encode()
+
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # logging every request would dominate the cost of serving it
+            pass
+
+    return Handler
+
+
+def simulator_spotify_client(url, session=None):
+    """
+    Creates a spotipy client that sends its requests to a simulator instead of api.spotify.com.
+
+    :param str url: Root URL of the simulator.
+    :param requests.Session session: HTTP session for the client, e.g. from `create_http_session`. Defaults to
+                                     spotipy's own session.
+    :return: Spotify API client.
+    :rtype: spotipy.Spotify
+    """
+    import spotipy
+
+    # the simulator doesn't check credentials, but spotipy needs a token to send
+    client = spotipy.Spotify(auth='simulator', requests_session=session if session is not None else True)
+    client.prefix = f'{url}/v1/'
+
+    return client
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve a synthetic Spotify API and Pitchfork site locally.')
+    parser.add_argument('--num-albums', type=int, default=10000, help='Number of albums in the synthetic catalog.')
+    parser.add_argument('--tracks-per-album', type=int, default=12, help='Number of tracks on each album.')
+    parser.add_argument('--title-variant-fraction', type=float, default=0.0,
+                        help='Fraction of albums whose Spotify title differs from their Pitchfork title.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to delay every response by.')
+    parser.add_argument('--latency-jitter', type=float, default=0.0, help='Maximum random seconds added to latency.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with a 503.')
+    parser.add_argument('--requests-per-second', type=float, help='Rate above which requests get 429 responses.')
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds of 429 responses.')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on.')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on.')
+    args = parser.parse_args(argv)
+
+    print(f'Generating catalog of {args.num_albums} albums...')
+    catalog = SyntheticCatalog(num_albums=args.num_albums, tracks_per_album=args.tracks_per_album,
+                               title_variant_fraction=args.title_variant_fraction)
+    simulator = ServiceSimulator(catalog, latency=args.latency, latency_jitter=args.latency_jitter,
+                                 error_rate=args.error_rate, requests_per_second=args.requests_per_second,
+                                 retry_after=args.retry_after, host=args.host, port=args.port)
+    print(f'Serving on {simulator.url} (Spotify API under {simulator.url}/v1/). Press Ctrl+C to stop.')
+    try:
+        simulator.serve_forever()
+    except KeyboardInterrupt:
+        print(json.dumps(simulator.stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+"""
+Contains functions and a catalog class that generate synthetic Spotify/Pitchfork data in the same shapes as the data
+acquired in `Data Acquisition & Cleaning.ipynb` (and the API responses it is acquired from), so that benchmarks can
+run offline at any scale.
+"""
+import re
+import numpy as np
+import pandas as pd
+
+from utilities.data_acquisition_utilities import TRACK_AUDIO_FEATURE_COLUMNS
+
+
+def make_track_table(num_tracks=100000, tracks_per_album=12, random_state=0):
+    """
+    Generates a table of track audio features, with tracks spread over albums of roughly `tracks_per_album` tracks.
+
+    :param int num_tracks: Number of tracks.
+    :param int tracks_per_album: Average number of tracks per album.
+    :param int random_state: Seed for the random number generator.
+    :return: Pandas DataFrame with the same columns as `get_spotify_track_audio_features` returns.
+    :rtype: pandas.DataFrame
+    """
+    rng = np.random.RandomState(random_state)
+    num_albums = max(num_tracks // tracks_per_album, 1)
+    album_ids = np.sort(rng.randint(0, num_albums, size=num_tracks))
+
+    df_tracks = pd.DataFrame({
+        'Track URI': [f'spotify:track:{i:022d}' for i in range(num_tracks)],
+        'Album Title': [f'Album {i}' for i in album_ids],
+        'Artist': [f'Artist {i // 3}' for i in album_ids],
+        'Duration (ms)': rng.randint(60000, 600000, size=num_tracks),
+        'Tempo': rng.uniform(60, 200, size=num_tracks),
+        'Key': rng.randint(0, 12, size=num_tracks),
+        'Mode': rng.randint(0, 2, size=num_tracks),
+        'Time Signature': rng.choice([3, 4, 5], size=num_tracks),
+        'Danceability': rng.uniform(0, 1, size=num_tracks),
+        'Energy': rng.uniform(0, 1, size=num_tracks),
+        'Loudness': rng.uniform(-30, 0, size=num_tracks),
+        'Speechiness': rng.uniform(0, 1, size=num_tracks),
+        'Acousticness': rng.uniform(0, 1, size=num_tracks),
+        'Instrumentalness': rng.uniform(0, 1, size=num_tracks),
+        'Liveness': rng.uniform(0, 1, size=num_tracks),
+        'Valence': rng.uniform(0, 1, size=num_tracks)
+    })
+
+    return df_tracks[TRACK_AUDIO_FEATURE_COLUMNS]
+
+
+GENRES = ['Electronic', 'Experimental', 'Folk/Country', 'Global', 'Jazz', 'Metal', 'Pop/R&B', 'Rap/Hip-Hop', 'Rock']
+
+
+class SyntheticCatalog:
+    """
+    Synthetic music catalog that can render Spotify API objects (albums, tracks, artists, audio features, search
+    results) and Pitchfork reviews in the shapes the acquisition functions expect. Generated deterministically from a
+    seed, so every benchmark or load test run sees the same data.
+    """
+
+    def __init__(self, num_albums=1000, tracks_per_album=12, albums_per_artist=3, title_variant_fraction=0.0,
+                 random_state=0):
+        """
+        :param int num_albums: Number of albums.
+        :param int tracks_per_album: Number of tracks on each album.
+        :param int albums_per_artist: Number of albums by each artist.
+        :param float title_variant_fraction: Fraction of albums whose Spotify title has an edition note (e.g.
+                                             "Album 7 (Deluxe Edition)") that their Pitchfork review title doesn't, so
+                                             exact album searches miss them.
+        :param int random_state: Seed for the random number generator.
+        """
+        rng = np.random.RandomState(random_state)
+        # separate generator, so that title variants don't change the rest of the catalog
+        variant_rng = np.random.RandomState(random_state + 1)
+        num_artists = max(num_albums // albums_per_artist, 1)
+
+        self.artists = {}
+        for i in range(num_artists):
+            artist_id = f'ar{i:020d}'
+            self.artists[artist_id] = {
+                'id': artist_id,
+                'uri': f'spotify:artist:{artist_id}',
+                'name': f'Artist {i}',
+                'type': 'artist',
+                'followers': {'href': None, 'total': int(rng.lognormal(10, 2))},
+                'popularity': int(rng.randint(0, 101))
+            }
+        artist_ids = list(self.artists)
+        self._artist_ids_by_name = {artist['name'].lower(): artist_id for artist_id, artist in self.artists.items()}
+
+        self.albums, self.tracks, self.audio_features, self.reviews = {}, {}, {}, []
+        self._album_ids_by_name, self._album_ids_by_artist = {}, {}
+        for i in range(num_albums):
+            album_id = f'al{i:020d}'
+            artist = self.artists[artist_ids[i % num_artists]]
+            track_ids = [f'tr{i * tracks_per_album + j:020d}' for j in range(tracks_per_album)]
+            album_name = f'Album {i}'
+            if variant_rng.uniform() < title_variant_fraction:
+                album_name = f'{album_name} (Deluxe Edition)'
+            self.albums[album_id] = {
+                'id': album_id,
+                'uri': f'spotify:album:{album_id}',
+                'name': album_name,
+                'type': 'album',
+                'album_type': 'album',
+                'artists': [_simplified(artist)],
+                'total_tracks': tracks_per_album,
+                'track_ids': track_ids
+            }
+            self._album_ids_by_name[(album_name.lower(), artist['name'].lower())] = album_id
+            self._album_ids_by_artist.setdefault(artist['id'], []).append(album_id)
+
+            for j, track_id in enumerate(track_ids):
+                self.tracks[track_id] = {
+                    'id': track_id,
+                    'uri': f'spotify:track:{track_id}',
+                    'name': f'Track {j + 1}',
+                    'type': 'track',
+                    'track_number': j + 1,
+                    'artists': [_simplified(artist)],
+                    'popularity': int(rng.randint(0, 101)),
+                    'album_id': album_id
+                }
+                self.audio_features[track_id] = {
+                    'id': track_id,
+                    'uri': f'spotify:track:{track_id}',
+                    'type': 'audio_features',
+                    'duration_ms': int(rng.randint(60000, 600000)),
+                    'tempo': float(rng.uniform(60, 200)),
+                    'key': int(rng.randint(0, 12)),
+                    'mode': int(rng.randint(0, 2)),
+                    'time_signature': int(rng.choice([3, 4, 5])),
+                    'danceability': float(rng.uniform(0, 1)),
+                    'energy': float(rng.uniform(0, 1)),
+                    'loudness': float(rng.uniform(-30, 0)),
+                    'speechiness': float(rng.uniform(0, 1)),
+                    'acousticness': float(rng.uniform(0, 1)),
+                    'instrumentalness': float(rng.uniform(0, 1)),
+                    'liveness': float(rng.uniform(0, 1)),
+                    'valence': float(rng.uniform(0, 1))
+                }
+
+            self.reviews.append({
+                'slug': f'album-{i}-artist-{i % num_artists}',
+                'artist': artist['name'],
+                'album': f'Album {i}',
+                'genre': GENRES[i % len(GENRES)],
+                'rating': round(float(rng.uniform(0, 10)), 1)
+            })
+
+    @staticmethod
+    def parse_id(id_or_uri):
+        """
+        :param str id_or_uri: Spotify ID or URI (e.g. 'spotify:album:<id>').
+        :return: Spotify ID.
+        :rtype: str
+        """
+        return id_or_uri.split(':')[-1]
+
+    def album(self, album_id, track_limit=50):
+        """
+        :return: Full album object, including the first page of its tracks.
+        :rtype: dict
+        """
+        album = self.albums.get(self.parse_id(album_id))
+        if album is None:
+            return None
+
+        album = {k: v for k, v in album.items() if k != 'track_ids'}
+        album['tracks'] = self.album_tracks(album_id, limit=track_limit)
+
+        return album
+
+    def album_tracks(self, album_id, limit=50, offset=0):
+        """
+        :return: Page of simplified track objects on an album.
+        :rtype: dict
+        """
+        track_ids = self.albums[self.parse_id(album_id)]['track_ids']
+        page = track_ids[offset:offset + limit]
+        next_offset = offset + limit
+
+        return {
+            'items': [{k: v for k, v in self.tracks[track_id].items() if k not in ('popularity', 'album_id')}
+                      for track_id in page],
+            'limit': limit,
+            'offset': offset,
+            'total': len(track_ids),
+            'next': f'offset={next_offset}' if next_offset < len(track_ids) else None
+        }
+
+    def track(self, track_id):
+        track = self.tracks.get(self.parse_id(track_id))
+        if track is None:
+            return None
+
+        album = self.albums[track['album_id']]
+        return dict({k: v for k, v in track.items() if k != 'album_id'},
+                    album={k: v for k, v in album.items() if k != 'track_ids'})
+
+    def artist(self, artist_id):
+        return self.artists.get(self.parse_id(artist_id))
+
+    def track_audio_features(self, track_id):
+        return self.audio_features.get(self.parse_id(track_id))
+
+    def artist_albums(self, artist_id, limit=20, offset=0):
+        """
+        :return: Page of simplified album objects by an artist, newest first.
+        :rtype: dict
+        """
+        album_ids = self._album_ids_by_artist.get(self.parse_id(artist_id), [])[::-1]
+        page = album_ids[offset:offset + limit]
+        next_offset = offset + limit
+
+        return {
+            'items': [{k: v for k, v in self.albums[album_id].items() if k != 'track_ids'} for album_id in page],
+            'limit': limit,
+            'offset': offset,
+            'total': len(album_ids),
+            'next': f'offset={next_offset}' if next_offset < len(album_ids) else None
+        }
+
+    def search_artists(self, query, limit=10):
+        """
+        Answers an artist search query of the form 'artist:<name>', as made by `ArtistDiscographyIndex`.
+
+        :return: Search response with at most one matching artist.
+        :rtype: dict
+        """
+        match = re.match(r'artist:(?P<artist>.*)', query)
+        artist_id = self._artist_ids_by_name.get(match.group('artist').strip().lower()) if match else None
+        items = [] if artist_id is None else [self.artists[artist_id]]
+
+        return {'artists': {'items': items[:limit], 'limit': limit, 'offset': 0, 'total': len(items), 'next': None}}
+
+    def search_albums(self, query, limit=10):
+        """
+        Answers an album search query of the form 'album:<name> artist:<name>', as made by `get_spotify_album`.
+
+        :return: Search response with at most one matching album.
+        :rtype: dict
+        """
+        match = re.match(r'album:(?P<album>.*) artist:(?P<artist>.*)', query)
+        album_id = None
+        if match:
+            album_id = self._album_ids_by_name.get((match.group('album').strip().lower(),
+                                                    match.group('artist').strip().lower()))
+        items = [] if album_id is None else [{k: v for k, v in self.albums[album_id].items() if k != 'track_ids'}]
+
+        return {'albums': {'items': items[:limit], 'limit': limit, 'offset': 0, 'total': len(items), 'next': None}}
+
+    def pitchfork_review_html(self, review):
+        """
+        :param dict review: One of `reviews`.
+        :return: HTML of a Pitchfork album review page, with the elements `get_album_rating` reads.
+        :rtype: str
+        """
+        return PITCHFORK_REVIEW_TEMPLATE.format(artist=review['artist'], album=review['album'],
+                                                rating=review['rating'])
+
+    def pitchfork_listing_html(self, reviews, reviews_per_fragment=12):
+        """
+        :param list reviews: Reviews to list, e.g. `reviews` filtered by genre.
+        :param int reviews_per_fragment: Number of reviews per infinite-scroll fragment, like pitchfork.com.
+        :return: HTML of a Pitchfork album review listing page, with the elements `get_album_review_urls` reads.
+        :rtype: str
+        """
+        fragments = [self.pitchfork_listing_fragment_html(reviews[start:start + reviews_per_fragment])
+                     for start in range(0, len(reviews), reviews_per_fragment)]
+
+        return PITCHFORK_LISTING_TEMPLATE.format(fragments=''.join(fragments))
+
+    @staticmethod
+    def pitchfork_listing_fragment_html(reviews):
+        """
+        :param list reviews: Reviews in the fragment.
+        :return: HTML of one infinite-scroll fragment of a Pitchfork album review listing page.
+        :rtype: str
+        """
+        links = ''.join(PITCHFORK_LISTING_REVIEW_TEMPLATE.format(**review) for review in reviews)
+
+        return f'<div class="review-collection-fragment">{links}</div>'
+
+
+def _simplified(artist):
+    return {'id': artist['id'], 'uri': artist['uri'], 'name': artist['name'], 'type': 'artist'}
+
+
+PITCHFORK_REVIEW_TEMPLATE = '''<!DOCTYPE html>
+<html lang="en">
+<head><title>{album} by {artist} Review | Pitchfork</title><meta charset="utf-8"></head>
+<body>
+<header class="site-header"><nav><a href="/reviews/albums/">Albums</a><a href="/reviews/tracks/">Tracks</a></nav></header>
+<article class="review-detail">
+  <div class="single-album-tombstone">
+    <ul class="artist-links artist-list single-album-tombstone__artist-links"><li><a href="/artists/1-x/">{artist}</a></li></ul>
+    <h1 class="single-album-tombstone__review-title">{album}</h1>
+    <div class="score-box"><div class="score-circle"><span class="score">{rating}</span></div></div>
+  </div>
+  <div class="review-detail__article-content">
+    <p>{review_text}</p>
+  </div>
+</article>
+<footer><p>&copy; Condé Nast</p></footer>
+</body>
+</html>
+'''.replace('{review_text}', ' '.join(['Lorem ipsum dolor sit amet, consectetur adipiscing elit.'] * 150))
+
+PITCHFORK_LISTING_REVIEW_TEMPLATE = (
+    '<div class="review"><a class="review__link" href="/reviews/albums/{slug}/">'
+    '<div class="review__title"><ul class="artist-list review__title-artist"><li>{artist}</li></ul>'
+    '<h2 class="review__title-album">{album}</h2></div></a>'
+    '<ul class="genre-list"><li><a class="genre-list__link">{genre}</a></li></ul></div>'
+)
+
+PITCHFORK_LISTING_TEMPLATE = '''<!DOCTYPE html>
+<html lang="en">
+<head><title>Album Reviews | Pitchfork</title><meta charset="utf-8"></head>
+<body>
+<header class="site-header"><nav><a href="/reviews/albums/">Albums</a></nav></header>
+<div class="fragment-list">{fragments}</div>
+</body>
+</html>
+'''
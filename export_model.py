@@ -0,0 +1,18 @@
+"""
+Exports the pickled scikit-learn model to a versioned JSON coefficients file that can be scored with NumPy alone
+(see `utilities/linear_scorer.py`), after checking that both produce the same predictions.
+
+Usage: python export_model.py [data/final_model.pkl] [data/final_model_coefficients.json]
+"""
+import sys
+
+from utilities.linear_scorer import export_linear_model
+from utilities.serving_utilities import MODEL_FEATURES
+
+
+if __name__ == '__main__':
+    model_path = sys.argv[1] if len(sys.argv) > 1 else 'data/final_model.pkl'
+    output_path = sys.argv[2] if len(sys.argv) > 2 else 'data/final_model_coefficients.json'
+
+    scorer = export_linear_model(model_path, output_path, feature_names=MODEL_FEATURES)
+    print(f"Exported {scorer.metadata['estimator']} with {scorer.n_features} features to {output_path}.")
@@ -0,0 +1,11 @@
+"""
+Serves popularity predictions over HTTP as JSON, coalescing concurrent requests into micro-batches.
+
+Usage: python prediction_service.py [--port 8000] [--model data/final_model.pkl] [--max-batch-size 1024]
+                                    [--max-wait-ms 2]
+"""
+from utilities.prediction_service import main
+
+
+if __name__ == '__main__':
+    main()
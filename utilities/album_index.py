@@ -0,0 +1,202 @@
+"""
+Contains an index of artists' Spotify discographies, used to resolve Pitchfork albums to Spotify albums. Instead of one
+exact-match search per album, each artist's discography is fetched once, and albums are matched against it in memory by
+fuzzy title similarity, which also tolerates title differences such as "(Deluxe Edition)" or missing accents.
+"""
+import re
+import difflib
+import threading
+import unicodedata
+
+from utilities.response_cache import cached_call
+from utilities.data_acquisition_utilities import get_spotify_album
+
+
+# maximum number of albums per page of Spotify's artist albums endpoint
+ALBUMS_PER_PAGE = 50
+
+# release types fetched for each artist. Pitchfork reviews EPs, which Spotify files under singles.
+ALBUM_TYPES = 'album,single'
+
+# parenthesized edition/version notes that Spotify appends to titles, e.g. "(Deluxe Edition)" or "[2011 Remaster]"
+EDITION_PATTERN = re.compile(r'[\(\[][^\)\]]*(edition|version|remaster|reissue|expanded|anniversary|bonus|deluxe)'
+                             r'[^\)\]]*[\)\]]')
+
+NUMBER_PATTERN = re.compile(r'\d+')
+
+
+def normalize_title(title):
+    """
+    Normalizes an album or artist name for matching: strips accents, edition notes and punctuation, drops an "EP"
+    suffix, and lowercases.
+
+    :param str title: Album or artist name.
+    :return: Normalized name.
+    :rtype: str
+    """
+    title = unicodedata.normalize('NFKD', title)
+    title = ''.join(c for c in title if not unicodedata.combining(c)).lower()
+    title = EDITION_PATTERN.sub(' ', title).replace('&', ' and ')
+    title = re.sub(r'[^\w\s]', ' ', title)
+    title = re.sub(r'\s+ep$', '', title.strip())
+
+    return ' '.join(title.split())
+
+
+def title_similarity(a, b):
+    """
+    Scores how similar two titles are. Titles containing different numbers are never similar, since they are usually
+    different volumes or years (e.g. "Vol. 1" and "Vol. 2") that would otherwise score close to identical.
+
+    :param str a: Normalized title.
+    :param str b: Normalized title.
+    :return: Similarity between 0 (nothing in common) and 1 (identical).
+    :rtype: float
+    """
+    if NUMBER_PATTERN.findall(a) != NUMBER_PATTERN.findall(b):
+        return 0.0
+
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+
+class ArtistDiscographyIndex:
+    """
+    Resolves (album name, artist name) pairs to Spotify albums. The first time an artist is seen, their Spotify artist
+    ID is searched for and their discography is fetched (50 albums per request) and indexed by normalized title. Every
+    album by that artist is then matched in memory. Albums that can't be matched with at least `min_similarity` fall
+    back to `get_spotify_album`'s exact search. Safe to share between threads; each artist is only fetched once.
+    """
+
+    def __init__(self, spotify_api_client, cache=None, min_similarity=0.85):
+        """
+        :param object spotify_api_client: Client used to authenticate and make requests to Spotify's API.
+        :param utilities.response_cache.ResponseCache cache: Cache for artist search and discography responses.
+                                                             Defaults to no caching.
+        :param float min_similarity: Minimum title similarity (see `title_similarity`) for a fuzzy match.
+        """
+        self.spotify_api_client = spotify_api_client
+        self.cache = cache
+        self.min_similarity = min_similarity
+
+        # normalized artist name -> {normalized album title: album}, or None if the artist wasn't found
+        self._discographies = {}
+        self._artist_locks = {}
+        self._lock = threading.Lock()
+        self.artists_fetched, self.matches, self.fallbacks = 0, 0, 0
+
+    def _search_artist(self, artist_name):
+        """
+        :param str artist_name: Artist name.
+        :return: Spotify artist record whose name matches best, or None if there isn't a close enough one.
+        :rtype: dict
+        """
+        query = f'artist:{artist_name}'
+        response = cached_call(self.cache, 'spotify_artist_search', (query, 'artist'),
+                               lambda: self.spotify_api_client.search(q=query, type='artist'))
+
+        normalized_name = normalize_title(artist_name)
+        best_similarity, best_artist = 0.0, None
+        for artist in response['artists']['items']:
+            similarity = title_similarity(normalized_name, normalize_title(artist['name']))
+            if similarity > best_similarity:
+                best_similarity, best_artist = similarity, artist
+
+        return best_artist if best_similarity >= self.min_similarity else None
+
+    def _fetch_discography(self, artist_id):
+        """
+        :param str artist_id: Spotify artist ID or URI.
+        :return: Simplified album records of all the artist's albums and singles.
+        :rtype: list
+        """
+        albums, offset = [], 0
+        while True:
+            page = cached_call(self.cache, 'spotify_artist_albums', (artist_id, ALBUM_TYPES, offset),
+                               lambda: self.spotify_api_client.artist_albums(artist_id, album_type=ALBUM_TYPES,
+                                                                             limit=ALBUMS_PER_PAGE, offset=offset))
+            albums.extend(page['items'])
+            if page['next'] is None or not page['items']:
+                return albums
+            offset += len(page['items'])
+
+    def discography(self, artist_name):
+        """
+        Returns an artist's indexed discography, fetching it on first use.
+
+        :param str artist_name: Artist name.
+        :return: Albums by normalized title, or None if the artist couldn't be found on Spotify.
+        :rtype: dict
+        """
+        key = normalize_title(artist_name)
+        with self._lock:
+            if key in self._discographies:
+                return self._discographies[key]
+            artist_lock = self._artist_locks.setdefault(key, threading.Lock())
+
+        # only one thread fetches each artist, while other artists can be fetched concurrently
+        with artist_lock:
+            if key not in self._discographies:
+                artist = self._search_artist(artist_name)
+                discography = None
+                if artist is not None:
+                    discography = {}
+                    # the first release with a title wins, which is the newest since Spotify lists newest first
+                    for album in self._fetch_discography(artist['id']):
+                        discography.setdefault(normalize_title(album['name']), album)
+                with self._lock:
+                    self._discographies[key] = discography
+                    self.artists_fetched += 1
+
+        return self._discographies[key]
+
+    def match(self, album_name, artist_name):
+        """
+        Matches an album against its artist's discography, without falling back to search.
+
+        :param str album_name: Name of the album.
+        :param str artist_name: Artist of the album.
+        :return: Simplified Spotify album record, or None if there is no close enough match.
+        :rtype: dict
+        """
+        discography = self.discography(artist_name)
+        if not discography:
+            return None
+
+        title = normalize_title(album_name)
+        if title in discography:
+            return discography[title]
+
+        best_title = max(discography, key=lambda candidate: title_similarity(title, candidate))
+        if title_similarity(title, best_title) >= self.min_similarity:
+            return discography[best_title]
+
+        return None
+
+    def find_album(self, album_name, artist_name):
+        """
+        Resolves an album to a Spotify album, from the index if possible and with a search otherwise. Can be used in
+        place of `get_spotify_album`.
+
+        :param str album_name: Name of the album.
+        :param str artist_name: Artist of the album.
+        :return: Spotify album record, or None if the album couldn't be found.
+        :rtype: dict
+        """
+        album = self.match(album_name, artist_name)
+        with self._lock:
+            if album is not None:
+                self.matches += 1
+            else:
+                self.fallbacks += 1
+        if album is not None:
+            return album
+
+        return get_spotify_album(self.spotify_api_client, album_name, artist_name, cache=self.cache)
+
+    def stats(self):
+        """
+        :return: Number of artists fetched, albums matched from the index, and albums that fell back to search.
+        :rtype: dict
+        """
+        with self._lock:
+            return {'artists_fetched': self.artists_fetched, 'matches': self.matches, 'fallbacks': self.fallbacks}
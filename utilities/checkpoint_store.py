@@ -0,0 +1,116 @@
+"""
+Contains an on-disk store for partial results of long-running data acquisition runs. Work units (genres, batches of
+albums, batches of tracks) are saved as soon as they finish, so an interrupted run can be restarted and skip the work
+that is already done.
+"""
+import os
+import pickle
+import hashlib
+import threading
+from urllib.parse import quote, unquote
+
+
+class CheckpointStore:
+    """
+    Stores the result of each completed work unit as a pickle file under `checkpoint_dir/<stage>/<name>.pkl`.
+    """
+
+    def __init__(self, checkpoint_dir):
+        """
+        :param str checkpoint_dir: Directory to store checkpoints in. Created if it doesn't exist.
+        """
+        self.checkpoint_dir = checkpoint_dir
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    def _path(self, stage, name):
+        # names such as 'Pop/R&B' aren't valid file names, so escape them
+        return os.path.join(self.checkpoint_dir, stage, f"{quote(str(name), safe='')}.pkl")
+
+    def has(self, stage, name):
+        """
+        :param str stage: Stage of the pipeline, e.g. 'pitchfork_genres'.
+        :param str name: Name of the work unit within the stage.
+        :return: Whether the work unit has been completed.
+        :rtype: bool
+        """
+        return os.path.exists(self._path(stage, name))
+
+    def save(self, stage, name, result):
+        """
+        Saves the result of a completed work unit. The file is written atomically, so a crash while saving never leaves
+        a truncated checkpoint behind.
+
+        :param str stage: Stage of the pipeline.
+        :param str name: Name of the work unit within the stage.
+        :param result: Picklable result of the work unit.
+        """
+        path = self._path(stage, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+    def load(self, stage, name):
+        """
+        :param str stage: Stage of the pipeline.
+        :param str name: Name of the work unit within the stage.
+        :return: Saved result of the work unit.
+        """
+        with open(self._path(stage, name), 'rb') as f:
+            return pickle.load(f)
+
+    def completed(self, stage):
+        """
+        :param str stage: Stage of the pipeline.
+        :return: Names of all completed work units in a stage.
+        :rtype: list
+        """
+        stage_dir = os.path.join(self.checkpoint_dir, stage)
+        if not os.path.isdir(stage_dir):
+            return []
+
+        return sorted(unquote(file_name[:-len('.pkl')]) for file_name in os.listdir(stage_dir)
+                      if file_name.endswith('.pkl'))
+
+    def clear(self, stage=None):
+        """
+        Removes the checkpoints of one stage, or of all stages.
+
+        :param str stage: Stage of the pipeline. Defaults to every stage.
+        """
+        stages = [stage] if stage is not None else [d for d in os.listdir(self.checkpoint_dir)
+                                                     if os.path.isdir(os.path.join(self.checkpoint_dir, d))]
+        for stage in stages:
+            for name in self.completed(stage):
+                os.remove(self._path(stage, name))
+
+
+def batch_name(index, items):
+    """
+    Names a batch of work by its position and a fingerprint of its contents, so that a checkpoint is only reused when
+    a restarted run produces exactly the same batch.
+
+    :param int index: Position of the batch.
+    :param list items: Items in the batch. Must have stable string representations.
+    :return: Name of the batch.
+    :rtype: str
+    """
+    fingerprint = hashlib.sha256(repr(list(items)).encode()).hexdigest()[:12]
+
+    return f'{index:06d}-{fingerprint}'
+
+
+def batches(items, batch_size):
+    """
+    Splits a list into consecutive batches, including a final partial batch.
+
+    :param list items: Items to split.
+    :param int batch_size: Maximum number of items per batch.
+    :return: Generator of (batch index, batch) tuples.
+    :rtype: generator
+    """
+    items = list(items)
+    for index, start in enumerate(range(0, len(items), batch_size)):
+        yield index, items[start:start + batch_size]
@@ -3,47 +3,243 @@ Contains utility functions necessary to scrape pitchfork album rating data and S
 perform some transformations.
 Author: Stephen Kaplan (July 8, 2020)
 """
+import re
+import json
 import time
+import warnings
+import threading
 import requests
 import pandas as pd
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
 from spotipy.client import SpotifyException
+from urllib3.util.retry import Retry
 
+from utilities.response_cache import cached_call
+from utilities.instrumentation import increment, outbound_call, timed
+from utilities.checkpoint_store import batch_name, batches
 
-def scroll_infinite_page(driver, num_albums, scroll_pause=1.0):
+
+# maximum number of IDs accepted by Spotify's batch endpoints
+ALBUMS_PER_REQUEST = 20
+TRACKS_PER_AUDIO_FEATURES_REQUEST = 100
+TRACKS_PER_REQUEST = 50
+ARTISTS_PER_REQUEST = 50
+
+PITCHFORK_URL = 'https://pitchfork.com'
+
+# lxml builds soups several times faster than Python's built-in parser, but is optional
+try:
+    import lxml     # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# elements of a Pitchfork review page read by `get_album_rating`, as tag name: class
+ALBUM_RATING_ELEMENTS = {'ul': 'artist-links', 'h1': 'single-album-tombstone__review-title', 'span': 'score'}
+
+# returns the number of review fragments loaded on a Pitchfork listing page, and the links of the reviews in all
+# fragments after the first `arguments[0]`, so that each call only transfers links that haven't been collected yet
+NEW_REVIEW_LINKS_SCRIPT = '''
+var fragments = document.getElementsByClassName('review-collection-fragment');
+var hrefs = [];
+for (var i = arguments[0]; i < fragments.length; i++) {
+    var links = fragments[i].getElementsByClassName('review__link');
+    for (var j = 0; j < links.length; j++) {
+        hrefs.push(links[j].getAttribute('href'));
+    }
+}
+return [fragments.length, hrefs];
+'''
+
+SCROLL_TO_BOTTOM_SCRIPT = 'window.scrollTo(0, document.body.scrollHeight);'
+
+TRACK_AUDIO_FEATURE_COLUMNS = ['Track URI', 'Album Title', 'Artist', 'Duration (ms)', 'Tempo', 'Key', 'Mode',
+                               'Time Signature', 'Danceability', 'Energy', 'Loudness', 'Speechiness', 'Acousticness',
+                               'Instrumentalness', 'Liveness', 'Valence']
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter that spaces out calls so that no more than `requests_per_second` are started per second, no
+    matter how many threads share it.
+    """
+
+    def __init__(self, requests_per_second):
+        """
+        :param float requests_per_second: Maximum number of calls per second. None or 0 disables limiting.
+        """
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_time = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """
+        Blocks until the caller is allowed to make its next call.
+        """
+        if not self.interval:
+            return
+
+        # reserve the next free slot, then sleep outside of the lock so other threads can reserve theirs
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_time, now)
+            self._next_time = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def create_http_session(pool_size=10, max_retries=3, backoff_factor=0.5):
+    """
+    Creates an HTTP session that reuses pooled connections and retries failed requests with exponential backoff
+    (including 429 "Too Many Requests" responses, honoring their Retry-After header).
+
+    :param int pool_size: Maximum number of connections kept open per host. Should be at least the number of threads
+                          sharing the session.
+    :param int max_retries: Maximum number of retries per request.
+    :param float backoff_factor: Backoff factor between retries. Retry n sleeps backoff_factor * 2^(n - 1) seconds.
+    :return: HTTP session.
+    :rtype: requests.Session
+    """
+    retry = Retry(total=max_retries, backoff_factor=backoff_factor, status_forcelist=(429, 500, 502, 503, 504))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    return session
+
+
+def _checkpoint_unless_failed(checkpoint, stage, name, result, failures):
+    """
+    Saves a completed work unit to the checkpoint store, unless some of its items failed with errors that may be
+    temporary (Spotify errors such as rate limiting, or exhausted HTTP retries). A resumed run then redoes the work unit
+    instead of loading it with those items missing for good; items that did succeed are usually served by the response
+    cache the second time.
+
+    :param utilities.checkpoint_store.CheckpointStore checkpoint: Checkpoint store, or None.
+    :param str stage: Stage of the pipeline.
+    :param str name: Name of the work unit within the stage.
+    :param result: Picklable result of the work unit.
+    :param list failures: Items of the work unit that failed.
+    """
+    if checkpoint is None:
+        return
+    if failures:
+        print(f'Not checkpointing {stage} {name}: {len(failures)} items failed and will be retried on the next run...')
+        return
+
+    checkpoint.save(stage, name, result)
+
+
+@timed
+def scroll_infinite_page(driver, num_albums, max_wait=10.0, poll_interval=0.05, scroll_pause=None):
     """
     Uses a Selenium web driver to scroll down on an "infinitely scrolling page" on Pitchfork.com. This causes more
-    album reviews to load on the page. Scrolls until it counts a sufficient number of album review elements on the
-    HTML page.
+    album reviews to load on the page. Scrolls until a sufficient number of album reviews has loaded, or no more load.
+
+    Review links are collected from each fragment of reviews as it loads, rather than by parsing the whole page at the
+    end. After each scroll the page is polled (backing off exponentially), so scrolling resumes as soon as the next
+    fragment appears instead of after a fixed pause.
 
     :param selenium.webdriver.chrome.webdriver.WebDriver driver: Selenium web driver
     :param int num_albums: The number of albums to pull Pitchfork reviews for.
-    :param float scroll_pause: Time (seconds) to wait for page to load after scroll.
+    :param float max_wait: Maximum time (seconds) to wait for more reviews to load after a scroll before giving up.
+    :param float poll_interval: Initial time (seconds) between checks for newly loaded reviews.
+    :param float scroll_pause: Deprecated alias of poll_interval. Scrolling no longer pauses for a fixed time.
+    :return: Relative links to the loaded album reviews, in page order. Callers that only need the page scrolled can
+             ignore it.
+    :rtype: list
     """
-    # scroll on the page a large amount of times until number of desired album records are visible on page
-    for i in range(1000):
-        num_review_collections = len(driver.find_elements_by_class_name('review-collection-fragment'))
-        # there are 12 album records per review collection. check if total album records is sufficient
-        if num_review_collections*12 >= num_albums:
+    if scroll_pause is not None:
+        # stacklevel 3 points past the @timed wrapper, at the caller
+        warnings.warn('scroll_pause is deprecated, use poll_interval instead.', DeprecationWarning, stacklevel=3)
+        poll_interval = scroll_pause
+
+    num_fragments, hrefs = driver.execute_script(NEW_REVIEW_LINKS_SCRIPT, 0)
+    while len(hrefs) < num_albums:
+        # scroll down to bottom and wait for the next fragment of reviews to load
+        driver.execute_script(SCROLL_TO_BOTTOM_SCRIPT)
+        increment('outbound_calls', endpoint='pitchfork_listing_scroll')
+        num_fragments_loaded, new_hrefs = _wait_for_new_review_links(driver, num_fragments, max_wait, poll_interval)
+        if num_fragments_loaded == num_fragments:
+            print(f'No more album reviews loaded after {len(hrefs)} reviews...')
             break
-        else:
-            # scroll down to bottom and wait to load page
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(scroll_pause)
+        num_fragments = num_fragments_loaded
+        hrefs.extend(new_hrefs)
+
+    return hrefs
+
 
+def _wait_for_new_review_links(driver, num_fragments, max_wait, poll_interval, max_poll_interval=1.0):
+    """
+    Polls a Pitchfork listing page until review fragments beyond the first `num_fragments` have loaded.
 
-def get_album_rating(url, genre):
+    :param selenium.webdriver.chrome.webdriver.WebDriver driver: Selenium web driver
+    :param int num_fragments: Number of fragments already collected.
+    :param float max_wait: Maximum time (seconds) to wait for new fragments.
+    :param float poll_interval: Initial time (seconds) between polls. Doubles after every poll.
+    :param float max_poll_interval: Maximum time (seconds) between polls.
+    :return: Number of fragments loaded, and the relative links to the reviews in the new fragments.
+    :rtype: tuple
+    """
+    deadline = time.monotonic() + max_wait
+    while True:
+        num_fragments_loaded, hrefs = driver.execute_script(NEW_REVIEW_LINKS_SCRIPT, num_fragments)
+        if num_fragments_loaded > num_fragments or time.monotonic() >= deadline:
+            return num_fragments_loaded, hrefs
+        time.sleep(poll_interval)
+        poll_interval = min(poll_interval * 2, max_poll_interval)
+
+
+def _element_strainer(elements):
+    """
+    Creates a SoupStrainer that only lets specific elements (and their contents) into a soup, so that parsing a page
+    doesn't build a tree for everything else on it.
+
+    Uses the keyword form of SoupStrainer, whose behavior is the same across bs4 versions (unlike callables, whose
+    signature changed in bs4 4.13). A soup only takes one strainer, so an element whose tag is in `elements` but whose
+    class belongs to another tag also gets in; callers still select elements by tag and class.
+
+    :param dict elements: Tag names mapped to a class the tag must have.
+    :return: Strainer to pass to BeautifulSoup as `parse_only`.
+    :rtype: bs4.SoupStrainer
+    """
+    # while parsing, class attributes may not have been split into lists yet, so match whole words of the raw value
+    css_classes = '|'.join(re.escape(css_class) for css_class in elements.values())
+    class_pattern = re.compile(rf'(?:^|\s)(?:{css_classes})(?:\s|$)')
+
+    return SoupStrainer(list(elements), class_=class_pattern)
+
+
+@timed
+def get_album_rating(url, genre, session=None, timeout=10, cache=None, rate_limiter=None):
     """
     Scrapes album rating and other useful metadata from a Pitchfork album review page.
 
     :param str url: Full link to a Pitchfork album rating.
     :param str genre: Genre of album, simply used to add to data record that is returned.
+    :param requests.Session session: HTTP session to make the request with. Defaults to a one-off connection.
+    :param float timeout: Seconds to wait for the server before giving up.
+    :param utilities.response_cache.ResponseCache cache: Cache for the page's HTML. Defaults to no caching.
+    :param RateLimiter rate_limiter: Limiter to wait for before requesting the page. Pages served from the cache don't
+                                     wait. Defaults to no limiting.
     :return: Dictionary containing album rating and useful metadata.
     :rtype: dict
     """
+    def fetch_html():
+        # only called on a cache miss (including expired entries), i.e. when the request actually goes out
+        if rate_limiter is not None:
+            rate_limiter.wait()
+        response = (session or requests).get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.text
+
     # get raw HTML
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+    html = cached_call(cache, 'pitchfork_review', (url,), fetch_html)
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=_element_strainer(ALBUM_RATING_ELEMENTS))
 
     # parse and extract desired album review data
     artist = soup.find('ul', attrs={'class': 'artist-links'}).find('a').text
@@ -53,23 +249,83 @@ def get_album_rating(url, genre):
     return {'Artist': artist, 'Album Title': album_title, 'Genre': genre, 'Rating': album_rating}
 
 
-def get_album_review_urls(driver, num_albums):
+@timed
+def get_album_review_urls(driver, num_albums, pitchfork_url=PITCHFORK_URL):
     """
     Gets links to specified number of album reviews.
 
     :param selenium.webdriver.chrome.webdriver.WebDriver driver: Selenium web driver
     :param int num_albums: The number of albums to pull Pitchfork reviews for.
+    :param str pitchfork_url: Root URL of Pitchfork, e.g. of a local simulator for load testing.
     :return: URLs to album reviews
     :rtype: list
     """
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
+    soup = BeautifulSoup(driver.page_source, HTML_PARSER, parse_only=_element_strainer({'a': 'review__link'}))
     reviews = soup.find_all('a', {'class': 'review__link'})
-    urls = [f"https://pitchfork.com{review.get('href')}" for review in reviews]
+    urls = [f"{pitchfork_url}{review.get('href')}" for review in reviews]
 
     return urls[0:num_albums]
 
 
-def get_pitchfork_album_ratings_for_genre(driver, genre, num_albums):
+def _is_permanent_http_error(error):
+    """
+    :param requests.RequestException error: Error raised by a request.
+    :return: Whether the server answered with a 4xx status other than 429 "Too Many Requests".
+    :rtype: bool
+    """
+    response = getattr(error, 'response', None)
+    if response is None:
+        return False
+
+    return 400 <= response.status_code < 500 and response.status_code != 429
+
+
+@timed
+def get_album_ratings(urls, genre, max_workers=8, requests_per_second=5.0, session=None, cache=None,
+                      failed_urls=None):
+    """
+    Scrapes album ratings from many Pitchfork album review pages concurrently. Requests share a pooled HTTP session, are
+    rate limited across all threads, and are retried with backoff. A page that still fails is reported and skipped, so
+    it doesn't abort the other pages.
+
+    :param list urls: Full links to Pitchfork album ratings.
+    :param str genre: Genre of albums, simply used to add to data records that are returned.
+    :param int max_workers: Number of pages to fetch at the same time.
+    :param float requests_per_second: Maximum number of requests to start per second. None disables limiting.
+    :param requests.Session session: HTTP session to make requests with. Defaults to a new pooled session.
+    :param utilities.response_cache.ResponseCache cache: Cache for review pages. Defaults to no caching.
+    :param list failed_urls: List that the links of pages that couldn't be fetched because of errors that may be
+                             temporary (network errors, 429s, 5xx responses) are appended to. Pages that returned
+                             other 4xx responses, or didn't have the expected review elements, are skipped for good.
+    :return: Dictionaries containing album ratings and useful metadata, in the same order as urls (minus failures).
+    :rtype: list
+    """
+    session = session or create_http_session(pool_size=max_workers)
+    rate_limiter = RateLimiter(requests_per_second)
+
+    def get_album_rating_or_none(url):
+        try:
+            return get_album_rating(url, genre, session=session, cache=cache, rate_limiter=rate_limiter)
+        except requests.RequestException as e:
+            print(f'Unable to fetch album rating from {url}: {e}')
+            # client errors other than rate limiting (e.g. 404 or 410 for a removed review) won't go away on a retry
+            if failed_urls is not None and not _is_permanent_http_error(e):
+                failed_urls.append(url)
+            return None
+        except (AttributeError, ValueError) as e:
+            # AttributeError/ValueError mean the page didn't have the expected review elements
+            print(f'Unable to scrape album rating from {url}: {e}')
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        album_ratings = list(executor.map(get_album_rating_or_none, urls))
+
+    return [album_rating for album_rating in album_ratings if album_rating is not None]
+
+
+@timed
+def get_pitchfork_album_ratings_for_genre(driver, genre, num_albums, max_workers=8, requests_per_second=5.0,
+                                          session=None, cache=None, pitchfork_url=PITCHFORK_URL, failed_urls=None):
     """
     Gets Pitchfork album ratings and other useful metadata for a particular genre and number of albums.
 
@@ -77,27 +333,37 @@ def get_pitchfork_album_ratings_for_genre(driver, genre, num_albums):
     :param str genre: Genre of music to get album reviews for. Must be one of: ['Electronic', 'Experimental',
                       'Folk/Country', 'Global', 'Jazz', 'Metal', 'Pop/R&B', 'Rap/Hip-Hop', 'Rock'].
     :param int num_albums: The number of albums to pull Pitchfork reviews for.
+    :param int max_workers: Number of review pages to fetch at the same time.
+    :param float requests_per_second: Maximum number of review page requests to start per second.
+    :param requests.Session session: HTTP session to fetch review pages with. Defaults to a new pooled session.
+    :param utilities.response_cache.ResponseCache cache: Cache for review pages. Defaults to no caching.
+    :param str pitchfork_url: Root URL of Pitchfork, e.g. of a local simulator for load testing.
+    :param list failed_urls: List that the links of review pages that couldn't be fetched are appended to.
     :return: Pandas DataFrame containing Pitchfork album review data for a particular genre of music.
     :rtype: pandas.DataFrame
     """
     print(f'Scraping Pitchfork album ratings for {genre} genre...')
 
     # compose full URL that will filter album ratings page to a single genre, and navigate to URL
-    base_url = 'https://pitchfork.com/reviews/albums/'
+    base_url = f'{pitchfork_url}/reviews/albums/'
     genre_lower = genre.lower().split('/')[0]       # somewhat different format in URL than web page
-    driver.get(url=f'{base_url}?genre={genre_lower}')
+    outbound_call('pitchfork_listing', lambda: driver.get(url=f'{base_url}?genre={genre_lower}'))
 
-    # scroll down infinite scrolling page enough times to display number of records requested.
-    scroll_infinite_page(driver, num_albums)
+    # scroll down infinite scrolling page enough times to display number of records requested, collecting review links
+    # as they load
+    review_links = scroll_infinite_page(driver, num_albums)
 
-    urls = get_album_review_urls(driver, num_albums)
-    album_ratings = [get_album_rating(url, genre) for url in urls]
+    urls = [f'{pitchfork_url}{review_link}' for review_link in review_links[:num_albums]]
+    album_ratings = get_album_ratings(urls, genre, max_workers=max_workers, requests_per_second=requests_per_second,
+                                      session=session, cache=cache, failed_urls=failed_urls)
     df_album_ratings_genre = pd.DataFrame(album_ratings)
 
     return df_album_ratings_genre
 
 
-def get_pitchfork_album_ratings(driver, genres, num_albums_per_genre):
+@timed
+def get_pitchfork_album_ratings(driver, genres, num_albums_per_genre, max_workers=8, requests_per_second=5.0,
+                                cache=None, checkpoint=None, pitchfork_url=PITCHFORK_URL):
     """
     Gets Pitchfork album ratings and other useful metadata for a specified list of genres, and number of albums reviews
     per genre.
@@ -107,27 +373,58 @@ def get_pitchfork_album_ratings(driver, genres, num_albums_per_genre):
     :param list genres: List of genre of music to get album reviews for. Must consist of only the following:
                         ['Electronic', 'Experimental', 'Folk/Country', 'Global', 'Jazz', 'Metal', 'Pop/R&B',
                         'Rap/Hip-Hop', 'Rock'].
+    :param int max_workers: Number of review pages to fetch at the same time.
+    :param float requests_per_second: Maximum number of review page requests to start per second.
+    :param utilities.response_cache.ResponseCache cache: Cache for review pages. Defaults to no caching.
+    :param utilities.checkpoint_store.CheckpointStore checkpoint: Store that each genre's ratings are saved to as soon
+                                                                  as they are scraped. Genres already saved are
+                                                                  skipped, and genres with review pages that
+                                                                  couldn't be fetched aren't saved, so they are
+                                                                  retried. Defaults to no checkpointing.
+    :param str pitchfork_url: Root URL of Pitchfork, e.g. of a local simulator for load testing.
     :return: Pandas DataFrame containing Pitchfork album review data.
     :rtype: pandas.DataFrame
     """
-    genre_dataframes = [get_pitchfork_album_ratings_for_genre(driver, genre, num_albums_per_genre) for genre in genres]
+    # share one pool of connections across all genres
+    session = create_http_session(pool_size=max_workers)
+
+    genre_dataframes = []
+    for genre in genres:
+        checkpoint_name = f'{genre}-{num_albums_per_genre}'
+        if checkpoint is not None and checkpoint.has('pitchfork_genres', checkpoint_name):
+            print(f'Loading checkpointed Pitchfork album ratings for {genre} genre...')
+            genre_dataframes.append(checkpoint.load('pitchfork_genres', checkpoint_name))
+            continue
+
+        failed_urls = []
+        df_album_ratings_genre = get_pitchfork_album_ratings_for_genre(driver, genre, num_albums_per_genre,
+                                                                       max_workers=max_workers,
+                                                                       requests_per_second=requests_per_second,
+                                                                       session=session, cache=cache,
+                                                                       pitchfork_url=pitchfork_url,
+                                                                       failed_urls=failed_urls)
+        _checkpoint_unless_failed(checkpoint, 'pitchfork_genres', checkpoint_name, df_album_ratings_genre, failed_urls)
+        genre_dataframes.append(df_album_ratings_genre)
     driver.quit()   # close Chrome window
 
     return pd.concat(genre_dataframes)
 
 
-def get_spotify_album(spotify_api_client, album_name, artist_name):
+@timed
+def get_spotify_album(spotify_api_client, album_name, artist_name, cache=None):
     """
     Search for Spotify album by album name and artist name and return result.
 
     :param object spotify_api_client: Client used to authenticate and make requests to Spotify's API.
     :param str album_name: Name of the album to search for.
     :param str artist_name: Artist of the album to search for.
+    :param utilities.response_cache.ResponseCache cache: Cache for search responses. Defaults to no caching.
     :return: Album data record from Spotify API.
     :rtype: dict
     """
     query = f'album:{album_name} artist:{artist_name}'
-    response = spotify_api_client.search(q=query, type='album')
+    response = cached_call(cache, 'spotify_search', (query, 'album'),
+                           lambda: spotify_api_client.search(q=query, type='album'))
     album_results = response['albums']['items']
     if not album_results:
         print(f'Unable to find {album_name} by {artist_name} on Spotify...')
@@ -137,18 +434,23 @@ def get_spotify_album(spotify_api_client, album_name, artist_name):
         return album
 
 
-def get_spotify_track_audio_features_for_album(spotify_api_client, album_uri):
+@timed
+def get_spotify_track_audio_features_for_album(spotify_api_client, album_uri, cache=None):
     """
     Get data describing certain qualities of every track/song on a particular album hosted on Spotify.
 
     :param object spotify_api_client: Client used to authenticate and make requests to Spotify's API.
     :param str album_uri: Unique identifier associated with album on Spotify.
+    :param utilities.response_cache.ResponseCache cache: Cache for album track and audio feature responses. Defaults
+                                                         to no caching.
     :return: List of dictionaries containing track audio features.
     :rtype: list
     """
-    album_tracks = spotify_api_client.album_tracks(album_uri)['items']
+    album_tracks = cached_call(cache, 'spotify_album_tracks', (album_uri,),
+                               lambda: spotify_api_client.album_tracks(album_uri))['items']
     album_track_uris = [track['uri'] for track in album_tracks]
-    track_audio_features = spotify_api_client.audio_features(tracks=album_track_uris)
+    track_audio_features = cached_call(cache, 'spotify_audio_features', (album_track_uris,),
+                                       lambda: spotify_api_client.audio_features(tracks=album_track_uris))
 
     return track_audio_features
 
@@ -167,110 +469,243 @@ def format_album_names_for_spotify(album_names):
     return album_names
 
 
-def get_spotify_track_audio_features(spotify_api_client, album_names, artist_names):
+@timed
+def get_spotify_track_audio_features(spotify_api_client, album_names, artist_names, cache=None, checkpoint=None,
+                                      checkpoint_batch_size=50, album_corrections=None, album_index=None):
     """
     Gets data describing certain qualities of every track/song on a list of albums hosted on Spotify.
 
     :param object spotify_api_client: Client used to authenticate and make requests to Spotify's API.
     :param list album_names: Album names of the albums to acquire track audio feature data from.
     :param list artist_names: Artist names corresponding to each album specified, in the same order as album_names.
+    :param utilities.response_cache.ResponseCache cache: Cache for Spotify API responses. Defaults to no caching.
+    :param utilities.checkpoint_store.CheckpointStore checkpoint: Store that each batch of albums is saved to as soon as
+                                                                  it is done. Batches already saved are skipped,
+                                                                  and batches with albums that failed with Spotify
+                                                                  errors aren't saved, so they are retried. Defaults
+                                                                  to no checkpointing.
+    :param int checkpoint_batch_size: Number of albums per checkpointed batch.
+    :param dict album_corrections: Maps (album name, artist name) to the URI of the correct Spotify album, for albums
+                                   that search resolves incorrectly (see `load_album_corrections`). Album names are
+                                   matched after `format_album_names_for_spotify`.
+    :param utilities.album_index.ArtistDiscographyIndex album_index: Index that albums are resolved with before falling
+                                                                     back to one search per album. Defaults to
+                                                                     searching for every album.
     :return: Pandas DataFrame containing track audio features and useful metadata.
     :rtype: object
     """
     album_names_spotify = format_album_names_for_spotify(album_names)
+    albums = list(zip(album_names_spotify, artist_names))
+    album_corrections = album_corrections or {}
 
     track_audio_features = []
-    for album_name, artist_name in zip(album_names_spotify, artist_names):
-        try:
-            album = get_spotify_album(spotify_api_client, album_name, artist_name)
-            if album is None:
-                continue
-            else:
-                track_audio_features_album = get_spotify_track_audio_features_for_album(spotify_api_client,
-                                                                                        album['uri'])
-                track_audio_features.extend({
-                    'Track URI': track['uri'],
-                    'Album Title': album_name,
-                    'Artist': artist_name,
-                    'Duration (ms)': track['duration_ms'],
-                    'Tempo': track['tempo'],
-                    'Key': track['key'],
-                    'Mode': track['mode'],
-                    'Time Signature': track['time_signature'],
-                    'Danceability': track['danceability'],
-                    'Energy': track['energy'],
-                    'Loudness': track['loudness'],
-                    'Speechiness': track['speechiness'],
-                    'Acousticness': track['acousticness'],
-                    'Instrumentalness': track['instrumentalness'],
-                    'Liveness': track['liveness'],
-                    'Valence': track['valence']
-                } for track in track_audio_features_album)
-
-        except (SpotifyException, TypeError):
-            print(f'Spotify Error for {album_name} by {artist_name}...')
+    for batch_index, album_batch in batches(albums, checkpoint_batch_size):
+        checkpoint_name = batch_name(batch_index, album_batch)
+        if checkpoint is not None and checkpoint.has('spotify_audio_feature_batches', checkpoint_name):
+            track_audio_features.extend(checkpoint.load('spotify_audio_feature_batches', checkpoint_name))
+            continue
+
+        track_audio_features_batch, failed_albums = [], []
+        for album_name, artist_name in album_batch:
+            track_audio_features_batch.extend(
+                _get_spotify_track_audio_features_for_album_name(spotify_api_client, album_name, artist_name, cache,
+                                                                 album_corrections.get((album_name, artist_name)),
+                                                                 album_index, failed_albums)
+            )
+
+        _checkpoint_unless_failed(checkpoint, 'spotify_audio_feature_batches', checkpoint_name,
+                                  track_audio_features_batch, failed_albums)
+        track_audio_features.extend(track_audio_features_batch)
 
     # convert to DataFrame and reorder columns
-    df_track_audio_features = pd.DataFrame(track_audio_features)
-    df_track_audio_features = df_track_audio_features[['Track URI', 'Album Title', 'Artist', 'Duration (ms)', 'Tempo',
-                                                       'Key', 'Mode', 'Time Signature', 'Danceability', 'Energy',
-                                                       'Loudness', 'Speechiness', 'Acousticness', 'Instrumentalness',
-                                                       'Liveness', 'Valence']]
+    df_track_audio_features = pd.DataFrame(track_audio_features, columns=TRACK_AUDIO_FEATURE_COLUMNS)
 
     return df_track_audio_features
 
 
-def get_spotify_track_popularity_and_artist_followers(spotify_api_client, track_uris):
+@timed
+def get_spotify_track_audio_features_batched(spotify_api_client, album_names, artist_names, max_workers=8, cache=None,
+                                             checkpoint=None, checkpoint_batch_size=500, album_corrections=None,
+                                             album_index=None):
     """
-    Gets track popularity score and number of artist followers of the track's artist from a list of track identifiers.
+    Batched version of `get_spotify_track_audio_features` that returns the same data with far fewer API round trips.
+    Instead of three calls per album (search, album tracks, audio features), albums are searched for concurrently, their
+    tracks are fetched 20 albums at a time through the multi-album endpoint, and audio features are fetched 100 tracks at
+    a time, regardless of which album the tracks belong to. Requests at every step are spread across a worker pool.
 
     :param object spotify_api_client: Client used to authenticate and make requests to Spotify's API.
-    :param list track_uris: List of Track URIs which are unique identifiers associated with tracks hosted on Spotify.
-    :return: Pandas DataFrame containing track popualrity score and artist follower data.
+    :param list album_names: Album names of the albums to acquire track audio feature data from.
+    :param list artist_names: Artist names corresponding to each album specified, in the same order as album_names.
+    :param int max_workers: Number of requests to make at the same time.
+    :param utilities.response_cache.ResponseCache cache: Cache for Spotify API responses. Defaults to no caching.
+    :param utilities.checkpoint_store.CheckpointStore checkpoint: Store that each batch of albums is saved to as soon as
+                                                                  it is done. Batches already saved are skipped,
+                                                                  and batches with albums that failed with Spotify
+                                                                  errors aren't saved, so they are retried. Defaults
+                                                                  to no checkpointing.
+    :param int checkpoint_batch_size: Number of albums per checkpointed batch. Also bounds how many albums are held in
+                                      memory at once.
+    :param dict album_corrections: Maps (album name, artist name) to the URI of the correct Spotify album, for albums
+                                   that search resolves incorrectly (see `load_album_corrections`). Album names are
+                                   matched after `format_album_names_for_spotify`.
+    :param utilities.album_index.ArtistDiscographyIndex album_index: Index that albums are resolved with before falling
+                                                                     back to one search per album. Defaults to
+                                                                     searching for every album.
+    :return: Pandas DataFrame containing track audio features and useful metadata.
     :rtype: object
     """
-    # break track URI list into groups of 50 (since endpoint can only handle 50 at a time)
-    group_size = 50
-    track_uri_groups = zip(*(iter(track_uris),) * group_size)
+    album_names_spotify = format_album_names_for_spotify(album_names)
+    albums = list(zip(album_names_spotify, artist_names))
 
-    # for each grouping, pull tracks, get popularity, and append to list
-    track_popularity = []
-    for track_uri_group in track_uri_groups:
-        response = spotify_api_client.tracks(tracks=list(track_uri_group))
-        tracks = response['tracks']
+    track_audio_features = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for batch_index, album_batch in batches(albums, checkpoint_batch_size):
+            checkpoint_name = batch_name(batch_index, album_batch)
+            if checkpoint is not None and checkpoint.has('spotify_audio_feature_batches', checkpoint_name):
+                track_audio_features.extend(checkpoint.load('spotify_audio_feature_batches', checkpoint_name))
+                continue
 
-        artist_uris = [track['artists'][0]['uri'] for track in tracks]
-        artists = spotify_api_client.artists(artist_uris)['artists']
+            failed_albums = []
+            track_audio_features_batch = _get_spotify_track_audio_features_batch(spotify_api_client, album_batch,
+                                                                                 executor, cache, album_corrections,
+                                                                                 album_index, failed_albums)
+            _checkpoint_unless_failed(checkpoint, 'spotify_audio_feature_batches', checkpoint_name,
+                                      track_audio_features_batch, failed_albums)
+            track_audio_features.extend(track_audio_features_batch)
 
-        track_popularity.extend([{
-            'Track URI': track['uri'],
-            'Popularity': track['popularity'],
-            'Artist Followers': artist['followers']['total']
-        } for track, artist in zip(tracks, artists)])
+    df_track_audio_features = pd.DataFrame(track_audio_features, columns=TRACK_AUDIO_FEATURE_COLUMNS)
 
-    df_spotify_track_popularity = pd.DataFrame(track_popularity)
+    return df_track_audio_features
 
-    return df_spotify_track_popularity
 
+def _get_spotify_track_audio_features_batch(spotify_api_client, albums, executor, cache=None, album_corrections=None,
+                                            album_index=None, failed_albums=None):
+    """
+    Gets track audio features for a batch of albums with batched API requests. See
+    `get_spotify_track_audio_features_batched`.
 
-def replace_track_features_with_correct_album(spotify_api_client, album_name, artist_name, correct_album_uri,
-                                              df_spotify):
+    :param object spotify_api_client: Client used to authenticate and make requests to Spotify's API.
+    :param list albums: (album name, artist name) tuples.
+    :param concurrent.futures.Executor executor: Worker pool to make requests with.
+    :param utilities.response_cache.ResponseCache cache: Cache for Spotify API responses. Defaults to no caching.
+    :param dict album_corrections: Maps (album name, artist name) to the URI of the correct Spotify album, for albums
+                                   that search resolves incorrectly. These albums aren't searched for.
+    :param utilities.album_index.ArtistDiscographyIndex album_index: Index to resolve albums with. Defaults to searching
+                                                                     for every album.
+    :param list failed_albums: List that (album name, artist name) tuples of albums that failed with Spotify errors are
+                               appended to.
+    :return: List of dictionaries containing track audio features and useful metadata.
+    :rtype: list
     """
-    Replaces track audio feature data in a Pandas DataFrame with track audio feature data from another album. Used to
-    replace incorrect data.
+    album_corrections = album_corrections or {}
+    failed_albums = [] if failed_albums is None else failed_albums
+
+    def search_album(album):
+        if album in album_corrections:
+            return {'id': album_corrections[album]}
+
+        album_name, artist_name = album
+        try:
+            if album_index is not None:
+                return album_index.find_album(album_name, artist_name)
+            return get_spotify_album(spotify_api_client, album_name, artist_name, cache=cache)
+        except SpotifyException:
+            print(f'Spotify Error for {album_name} by {artist_name}...')
+            failed_albums.append(album)
+            return None
+
+    # resolve every album name to a Spotify album
+    search_results = list(executor.map(search_album, albums))
+    found_albums = [(album, result['id']) for album, result in zip(albums, search_results) if result is not None]
+
+    return _get_spotify_track_audio_features_for_album_ids(spotify_api_client, found_albums, executor, cache,
+                                                           failed_albums)
+
+
+def _get_spotify_track_audio_features_for_album_ids(spotify_api_client, albums, executor, cache=None,
+                                                    failed_albums=None):
+    """
+    Gets track audio features for albums with known Spotify IDs, fetching album tracks 20 albums at a time and audio
+    features 100 tracks at a time.
 
     :param object spotify_api_client: Client used to authenticate and make requests to Spotify's API.
-    :param str album_name: Name of the album to search for.
-    :param str artist_name: Artist of the album to search for.
-    :param str correct_album_uri: Unique identifier correspond to album on Spotify to replace data with.
-    :param object df_spotify: Pandas DataFrame containing Spotify data. Specific to data generated in
-                              `Data Acquisition & Cleaning.ipynb`.
-    :return: Pandas DataFrame updated with new album track audio feature data.
-    :rtype: object
+    :param list albums: ((album name, artist name), Spotify album ID or URI) tuples.
+    :param concurrent.futures.Executor executor: Worker pool to make requests with.
+    :param utilities.response_cache.ResponseCache cache: Cache for Spotify API responses. Defaults to no caching.
+    :param list failed_albums: List that (album name, artist name) tuples of albums that failed with Spotify errors are
+                               appended to. Albums that Spotify doesn't know, or has no features for, aren't failures.
+    :return: List of dictionaries containing track audio features and useful metadata.
+    :rtype: list
+    """
+    failed_albums = [] if failed_albums is None else failed_albums
+    # album IDs and track URIs of requests that raised, as opposed to items Spotify returned None for
+    failed_album_ids, failed_track_uris = set(), set()
+
+    def get_albums(album_ids):
+        try:
+            return cached_call(cache, 'spotify_albums', (album_ids,),
+                               lambda: spotify_api_client.albums(album_ids))['albums']
+        except SpotifyException:
+            print(f'Spotify Error while fetching tracks of {len(album_ids)} albums...')
+            failed_album_ids.update(album_ids)
+            return [None] * len(album_ids)
+
+    def get_audio_features(track_uris):
+        try:
+            return cached_call(cache, 'spotify_audio_features', (track_uris,),
+                               lambda: spotify_api_client.audio_features(tracks=track_uris))
+        except SpotifyException:
+            print(f'Spotify Error while fetching audio features of {len(track_uris)} tracks...')
+            failed_track_uris.update(track_uris)
+            return [None] * len(track_uris)
+
+    # fetch tracks of up to 20 albums per request
+    album_ids = [album_id for _, album_id in albums]
+    album_id_groups = [album_ids[i:i + ALBUMS_PER_REQUEST] for i in range(0, len(album_ids), ALBUMS_PER_REQUEST)]
+    album_records = [record for group in executor.map(get_albums, album_id_groups) for record in group]
+
+    album_track_uris = []
+    for (album, album_id), album_record in zip(albums, album_records):
+        if album_record is None:
+            if album_id in failed_album_ids:
+                failed_albums.append(album)
+            continue
+        # the album endpoint includes the first page (50) of tracks, same as the album tracks endpoint's default
+        album_track_uris.append((album, [track['uri'] for track in album_record['tracks']['items']]))
+
+    # fetch audio features of up to 100 tracks per request, across album boundaries
+    track_uris = [uri for _, uris in album_track_uris for uri in uris]
+    track_uri_groups = [track_uris[i:i + TRACKS_PER_AUDIO_FEATURES_REQUEST]
+                        for i in range(0, len(track_uris), TRACKS_PER_AUDIO_FEATURES_REQUEST)]
+    audio_features = iter([features for group in executor.map(get_audio_features, track_uri_groups)
+                           for features in group])
+
+    track_audio_features = []
+    for (album_name, artist_name), uris in album_track_uris:
+        track_audio_features_album = [next(audio_features) for _ in uris]
+        # like the unbatched version, skip albums where Spotify is missing features for a track
+        if any(track is None for track in track_audio_features_album):
+            print(f'Spotify Error for {album_name} by {artist_name}...')
+            if failed_track_uris.intersection(uris):
+                failed_albums.append((album_name, artist_name))
+            continue
+        track_audio_features.extend(format_track_audio_features(track, album_name, artist_name)
+                                    for track in track_audio_features_album)
+
+    return track_audio_features
+
+
+def format_track_audio_features(track, album_name, artist_name):
+    """
+    Formats a track's audio features from the Spotify API as a data record.
+
+    :param dict track: Audio features of a track, as returned by the Spotify API.
+    :param str album_name: Name of the album the track is on.
+    :param str artist_name: Artist of the album the track is on.
+    :return: Dictionary containing track audio features and useful metadata.
+    :rtype: dict
     """
-    # get correct track features and convert to pandas DataFrame
-    correct_track_features = get_spotify_track_audio_features_for_album(spotify_api_client, correct_album_uri)
-    df_correct_track_features = pd.DataFrame([{
+    return {
         'Track URI': track['uri'],
         'Album Title': album_name,
         'Artist': artist_name,
@@ -287,15 +722,243 @@ def replace_track_features_with_correct_album(spotify_api_client, album_name, ar
         'Instrumentalness': track['instrumentalness'],
         'Liveness': track['liveness'],
         'Valence': track['valence']
-    } for track in correct_track_features])
+    }
+
+
+def _get_spotify_track_audio_features_for_album_name(spotify_api_client, album_name, artist_name, cache=None,
+                                                     album_uri=None, album_index=None, failed_albums=None):
+    """
+    Searches for an album on Spotify and gets the audio features of its tracks as data records.
+
+    :param object spotify_api_client: Client used to authenticate and make requests to Spotify's API.
+    :param str album_name: Name of the album to search for.
+    :param str artist_name: Artist of the album to search for.
+    :param utilities.response_cache.ResponseCache cache: Cache for Spotify API responses. Defaults to no caching.
+    :param str album_uri: URI of the correct Spotify album, if known. Skips the search.
+    :param utilities.album_index.ArtistDiscographyIndex album_index: Index to resolve the album with. Defaults to
+                                                                     searching for it.
+    :param list failed_albums: List that (album name, artist name) is appended to if Spotify returned an error.
+    :return: List of dictionaries containing track audio features and useful metadata. Empty if the album couldn't be
+             found or Spotify returned an error.
+    :rtype: list
+    """
+    try:
+        if album_uri is not None:
+            album = {'uri': album_uri}
+        elif album_index is not None:
+            album = album_index.find_album(album_name, artist_name)
+        else:
+            album = get_spotify_album(spotify_api_client, album_name, artist_name, cache=cache)
+        if album is None:
+            return []
+        else:
+            track_audio_features_album = get_spotify_track_audio_features_for_album(spotify_api_client, album['uri'],
+                                                                                    cache=cache)
+            return [format_track_audio_features(track, album_name, artist_name)
+                    for track in track_audio_features_album]
+
+    except SpotifyException:
+        print(f'Spotify Error for {album_name} by {artist_name}...')
+        if failed_albums is not None:
+            failed_albums.append((album_name, artist_name))
+        return []
+    except TypeError:
+        # Spotify has no audio features for some of the album's tracks
+        print(f'Spotify Error for {album_name} by {artist_name}...')
+        return []
+
+
+@timed
+def get_spotify_track_popularity_and_artist_followers(spotify_api_client, track_uris, cache=None, checkpoint=None,
+                                                      checkpoint_batch_size=1000, artist_followers=None):
+    """
+    Gets track popularity score and number of artist followers of the track's artist from a list of track identifiers.
+
+    Each artist's follower count is only fetched once per run (most tracks on an album share an artist), and only
+    artists that haven't been seen yet are requested, 50 at a time.
+
+    :param object spotify_api_client: Client used to authenticate and make requests to Spotify's API.
+    :param list track_uris: List of Track URIs which are unique identifiers associated with tracks hosted on Spotify.
+    :param utilities.response_cache.ResponseCache cache: Cache for track and artist responses. Defaults to no caching.
+    :param utilities.checkpoint_store.CheckpointStore checkpoint: Store that each batch of tracks is saved to as soon as
+                                                                  it is done. Batches already saved are skipped,
+                                                                  and batches with requests that failed with Spotify
+                                                                  errors aren't saved, so they are retried. Defaults
+                                                                  to no checkpointing.
+    :param int checkpoint_batch_size: Number of tracks per checkpointed batch. A multiple of 50 keeps every track
+                                      request full.
+    :param dict artist_followers: In-memory cache mapping artist URIs to follower counts, filled in as artists are
+                                  fetched. Pass the same dictionary to several calls to share lookups between them.
+    :return: Pandas DataFrame containing track popualrity score and artist follower data.
+    :rtype: object
+    """
+    artist_followers = {} if artist_followers is None else artist_followers
+
+    track_popularity = []
+    for batch_index, track_uri_batch in batches(track_uris, checkpoint_batch_size):
+        checkpoint_name = batch_name(batch_index, track_uri_batch)
+        if checkpoint is not None and checkpoint.has('spotify_popularity_batches', checkpoint_name):
+            track_popularity.extend(checkpoint.load('spotify_popularity_batches', checkpoint_name))
+            continue
+
+        failed_uris = []
+        track_popularity_batch = _get_spotify_track_popularity_and_artist_followers(spotify_api_client,
+                                                                                    track_uri_batch, artist_followers,
+                                                                                    cache, failed_uris)
+        _checkpoint_unless_failed(checkpoint, 'spotify_popularity_batches', checkpoint_name, track_popularity_batch,
+                                  failed_uris)
+        track_popularity.extend(track_popularity_batch)
+
+    df_spotify_track_popularity = pd.DataFrame(track_popularity)
+
+    return df_spotify_track_popularity
+
+
+def _get_spotify_track_popularity_and_artist_followers(spotify_api_client, track_uris, artist_followers, cache=None,
+                                                       failed_uris=None):
+    """
+    Gets track popularity score and number of artist followers of the track's artist as data records.
+
+    :param object spotify_api_client: Client used to authenticate and make requests to Spotify's API.
+    :param list track_uris: List of Track URIs which are unique identifiers associated with tracks hosted on Spotify.
+    :param dict artist_followers: In-memory cache mapping artist URIs to follower counts. Updated in place.
+    :param utilities.response_cache.ResponseCache cache: Cache for track and artist responses. Defaults to no caching.
+    :param list failed_uris: List that track and artist URIs of requests that failed with Spotify errors are appended
+                             to. Tracks in failed requests, and tracks whose artist's request failed, are left out.
+    :return: List of dictionaries containing track popularity score and artist follower data. Tracks whose artist has
+             no follower count (the artist request failed, or Spotify didn't return the artist) are left out, rather
+             than passed on with missing followers.
+    :rtype: list
+    """
+    failed_uris = [] if failed_uris is None else failed_uris
+
+    # pull tracks in groups of 50 (since endpoint can only handle 50 at a time), including the last partial group
+    tracks = []
+    for _, track_uri_group in batches(track_uris, TRACKS_PER_REQUEST):
+        try:
+            response = cached_call(cache, 'spotify_tracks', (track_uri_group,),
+                                   lambda: spotify_api_client.tracks(tracks=track_uri_group))
+        except SpotifyException:
+            print(f'Spotify Error while fetching {len(track_uri_group)} tracks...')
+            failed_uris.extend(track_uri_group)
+            continue
+        # unknown track URIs come back as None
+        tracks.extend(track for track in response['tracks'] if track is not None)
 
-    # filter out existing data with that
-    df_spotify_corrected = df_spotify[df_spotify['Album Title'] != album_name]
-    df_spotify_corrected = df_spotify_corrected.append(df_correct_track_features)
+    # only look up artists that haven't been seen yet, each one once, in full groups of 50
+    unseen_artist_uris = list(dict.fromkeys(track['artists'][0]['uri'] for track in tracks
+                                            if track['artists'][0]['uri'] not in artist_followers))
+    for _, artist_uri_group in batches(unseen_artist_uris, ARTISTS_PER_REQUEST):
+        try:
+            artists = cached_call(cache, 'spotify_artists', (artist_uri_group,),
+                                  lambda: spotify_api_client.artists(artist_uri_group))['artists']
+        except SpotifyException:
+            print(f'Spotify Error while fetching {len(artist_uri_group)} artists...')
+            failed_uris.extend(artist_uri_group)
+            continue
+        artist_followers.update((artist_uri, artist['followers']['total'])
+                                for artist_uri, artist in zip(artist_uri_group, artists) if artist is not None)
+
+    track_popularity = [{
+        'Track URI': track['uri'],
+        'Popularity': track['popularity'],
+        'Artist Followers': artist_followers.get(track['artists'][0]['uri'])
+    } for track in tracks]
+
+    num_missing_followers = sum(record['Artist Followers'] is None for record in track_popularity)
+    if num_missing_followers:
+        print(f'Leaving out {num_missing_followers} tracks without artist follower counts...')
+
+    return [record for record in track_popularity if record['Artist Followers'] is not None]
+
+
+def replace_track_features_with_correct_album(spotify_api_client, album_name, artist_name, correct_album_uri,
+                                              df_spotify):
+    """
+    Replaces track audio feature data in a Pandas DataFrame with track audio feature data from another album. Used to
+    replace incorrect data.
+
+    :param object spotify_api_client: Client used to authenticate and make requests to Spotify's API.
+    :param str album_name: Name of the album to search for.
+    :param str artist_name: Artist of the album to search for.
+    :param str correct_album_uri: Unique identifier correspond to album on Spotify to replace data with.
+    :param object df_spotify: Pandas DataFrame containing Spotify data. Specific to data generated in
+                              `Data Acquisition & Cleaning.ipynb`.
+    :return: Pandas DataFrame updated with new album track audio feature data.
+    :rtype: object
+    """
+    return apply_album_corrections(spotify_api_client, {(album_name, artist_name): correct_album_uri}, df_spotify)
+
+
+@timed
+def apply_album_corrections(spotify_api_client, album_corrections, df_spotify, max_workers=8, cache=None):
+    """
+    Replaces the track audio feature data of many albums at once with track audio feature data from the correct
+    Spotify albums. Replacement tracks are fetched with batched requests (20 albums, then 100 tracks per request), and
+    every correction is applied with a single filter and concatenation, rather than copying `df_spotify` once per
+    album.
+
+    :param object spotify_api_client: Client used to authenticate and make requests to Spotify's API.
+    :param dict album_corrections: Maps (album name, artist name) to the URI of the correct Spotify album. Existing rows
+                                   are matched on both album title and artist. Corrections whose album couldn't be
+                                   fetched are reported and leave the existing rows in place.
+    :param object df_spotify: Pandas DataFrame containing Spotify data. Specific to data generated in
+                              `Data Acquisition & Cleaning.ipynb`.
+    :param int max_workers: Number of requests to make at the same time.
+    :param utilities.response_cache.ResponseCache cache: Cache for Spotify API responses. Defaults to no caching.
+    :return: Pandas DataFrame updated with new album track audio feature data.
+    :rtype: object
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        correct_track_features = _get_spotify_track_audio_features_for_album_ids(
+            spotify_api_client, list(album_corrections.items()), executor, cache
+        )
+    df_correct_track_features = pd.DataFrame(correct_track_features, columns=TRACK_AUDIO_FEATURE_COLUMNS)
+
+    # only replace albums that replacement tracks were actually fetched for, rather than dropping them from the data
+    corrected_albums = set(zip(df_correct_track_features['Album Title'], df_correct_track_features['Artist']))
+    for album_name, artist_name in album_corrections:
+        if (album_name, artist_name) not in corrected_albums:
+            print(f'Unable to fetch the correct album for {album_name} by {artist_name}, keeping existing data...')
+
+    # filter out existing data for every corrected album at once, by (album title, artist)
+    df_spotify_corrected = df_spotify
+    if corrected_albums:
+        existing_albums = pd.MultiIndex.from_arrays([df_spotify['Album Title'], df_spotify['Artist']])
+        df_spotify_corrected = df_spotify[~existing_albums.isin(list(corrected_albums))]
+    df_spotify_corrected = pd.concat([df_spotify_corrected, df_correct_track_features])
 
     return df_spotify_corrected
 
 
+def save_album_corrections(album_corrections, path):
+    """
+    Saves album corrections to a JSON file, so that they can be reapplied to future dataset builds.
+
+    :param dict album_corrections: Maps (album name, artist name) to the URI of the correct Spotify album.
+    :param str path: Path to JSON file.
+    """
+    records = [{'Album Title': album_name, 'Artist': artist_name, 'Album URI': album_uri}
+               for (album_name, artist_name), album_uri in album_corrections.items()]
+    with open(path, 'w') as f:
+        json.dump(records, f, indent=2, ensure_ascii=False)
+
+
+def load_album_corrections(path):
+    """
+    Loads album corrections saved by `save_album_corrections`. The result can be passed as `album_corrections` to
+    `get_spotify_track_audio_features`, `get_spotify_track_audio_features_batched` or `apply_album_corrections`.
+
+    :param str path: Path to JSON file.
+    :return: Maps (album name, artist name) to the URI of the correct Spotify album.
+    :rtype: dict
+    """
+    with open(path) as f:
+        records = json.load(f)
+
+    return {(record['Album Title'], record['Artist']): record['Album URI'] for record in records}
+
+
 def generate_spotify_album_features(album_tracks):
     """
     Aggregates track-level audio feature data to album-level metrics.
@@ -306,7 +969,7 @@ def generate_spotify_album_features(album_tracks):
     """
     album_name = album_tracks['Album Title'].iloc[0]
     artist = album_tracks['Artist'].iloc[0]
-    num_tracks = len(album_tracks.shape)
+    num_tracks = len(album_tracks)
     duration_minutes = round(album_tracks['Duration (ms)'].sum()/1000/60, 2)
     avg_tempo = round(album_tracks['Tempo'].mean(), 2)
     majorness = round(album_tracks['Mode'].sum() / len(album_tracks), 4)
@@ -335,3 +998,48 @@ def generate_spotify_album_features(album_tracks):
         'Avg Liveness': [avg_liveness],
         'Avg Valence': [avg_valence]
     })
+
+
+@timed
+def generate_all_spotify_album_features(df_tracks):
+    """
+    Aggregates track-level audio feature data to album-level metrics for every album at once. Produces the same metrics
+    (and rounding) as applying `generate_spotify_album_features` to each album, but in a single vectorized groupby
+    instead of building a DataFrame per album.
+
+    :param object df_tracks: Pandas DataFrame containing track-level data for any number of albums.
+    :return: Pandas DataFrame with one row of album-level metrics per (album, artist).
+    :rtype: object
+    """
+    grouped = df_tracks.groupby(['Album Title', 'Artist'])
+    df_sums_and_means = grouped.agg({
+        'Duration (ms)': 'sum',
+        'Tempo': 'mean',
+        'Mode': 'sum',
+        'Danceability': 'mean',
+        'Energy': 'mean',
+        'Loudness': 'mean',
+        'Speechiness': 'mean',
+        'Acousticness': 'mean',
+        'Instrumentalness': 'mean',
+        'Liveness': 'mean',
+        'Valence': 'mean'
+    })
+    num_tracks = grouped.size()
+
+    df_album_features = pd.DataFrame({
+        'Number of Tracks': num_tracks,
+        'Duration (minutes)': (df_sums_and_means['Duration (ms)'] / 1000 / 60).round(2),
+        'Avg Tempo': df_sums_and_means['Tempo'].round(2),
+        'Majorness': (df_sums_and_means['Mode'] / num_tracks).round(4),
+        'Avg Danceability': df_sums_and_means['Danceability'].round(4),
+        'Avg Energy': df_sums_and_means['Energy'].round(4),
+        'Avg Loudness': df_sums_and_means['Loudness'].round(2),
+        'Avg Speechiness': df_sums_and_means['Speechiness'].round(4),
+        'Avg Acousticness': df_sums_and_means['Acousticness'].round(4),
+        'Avg Instrumentalness': df_sums_and_means['Instrumentalness'].round(4),
+        'Avg Liveness': df_sums_and_means['Liveness'].round(4),
+        'Avg Valence': df_sums_and_means['Valence'].round(4)
+    }).reset_index()
+
+    return df_album_features
@@ -0,0 +1,144 @@
+"""
+Contains a typed, columnar storage layer for the datasets acquired in `Data Acquisition & Cleaning.ipynb`. Tables are
+converted to compact dtypes (categorical strings, small integers, float32 audio features) and persisted as Parquet
+files, partitioned by genre where the table has a genre, so that loading only reads the genres and columns needed.
+"""
+import os
+from urllib.parse import quote, unquote
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# compact dtypes for each table. audio features only carry ~3 significant digits, so float32 loses nothing.
+SCHEMAS = {
+    'tracks': {
+        'Track URI': 'object',
+        'Album Title': 'category',
+        'Artist': 'category',
+        'Duration (ms)': 'int32',
+        'Tempo': 'float32',
+        'Key': 'int8',
+        'Mode': 'int8',
+        'Time Signature': 'int8',
+        'Danceability': 'float32',
+        'Energy': 'float32',
+        'Loudness': 'float32',
+        'Speechiness': 'float32',
+        'Acousticness': 'float32',
+        'Instrumentalness': 'float32',
+        'Liveness': 'float32',
+        'Valence': 'float32'
+    },
+    'albums': {
+        'Artist': 'category',
+        'Album Title': 'category',
+        'Genre': 'category',
+        'Rating': 'float32'
+    },
+    'popularity': {
+        'Track URI': 'object',
+        'Popularity': 'int8',
+        'Artist Followers': 'int64'
+    }
+}
+
+# merged training data (tracks joined with popularity and album genre/rating), as built at the end of
+# `Data Acquisition & Cleaning.ipynb`
+SCHEMAS['dataset'] = dict(SCHEMAS['tracks'], **SCHEMAS['popularity'], **SCHEMAS['albums'])
+
+PARTITION_COLUMN = 'Genre'
+UNPARTITIONED_FILE_NAME = 'all.parquet'
+
+
+def apply_schema(df, table):
+    """
+    Converts a DataFrame's columns to the compact dtypes of a table's schema. Columns that aren't in the schema are left
+    as they are. Integer columns containing missing values are kept as floats, since they can't hold NaN.
+
+    :param pandas.DataFrame df: Data to convert.
+    :param str table: Name of the table schema, one of SCHEMAS' keys.
+    :return: Converted copy of df.
+    :rtype: pandas.DataFrame
+    """
+    schema = SCHEMAS[table]
+    dtypes = {}
+    for column, dtype in schema.items():
+        if column not in df.columns or str(df[column].dtype) == dtype:
+            continue
+        if dtype.startswith('int') and df[column].isnull().any():
+            continue
+        dtypes[column] = dtype
+
+    return df.astype(dtypes)
+
+
+def _table_dir(root, table):
+    return os.path.join(root, table)
+
+
+def _partition_path(root, table, genre):
+    # genres such as 'Pop/R&B' aren't valid file names, so escape them
+    return os.path.join(_table_dir(root, table), f"{quote(genre, safe='')}.parquet")
+
+
+def save_table(df, table, root):
+    """
+    Persists a table as Parquet under `root/<table>/`, applying the table's schema first. Tables with a genre column
+    are written as one file per genre; others as a single file. Existing files of the table are replaced.
+
+    :param pandas.DataFrame df: Data to persist.
+    :param str table: Name of the table schema, one of SCHEMAS' keys.
+    :param str root: Root directory of the dataset store.
+    """
+    df = apply_schema(df, table)
+    table_dir = _table_dir(root, table)
+    os.makedirs(table_dir, exist_ok=True)
+    for file_name in os.listdir(table_dir):
+        if file_name.endswith('.parquet'):
+            os.remove(os.path.join(table_dir, file_name))
+
+    if PARTITION_COLUMN in df.columns:
+        for genre, df_genre in df.groupby(PARTITION_COLUMN, observed=True):
+            pq.write_table(pa.Table.from_pandas(df_genre, preserve_index=False),
+                           _partition_path(root, table, str(genre)))
+    else:
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False),
+                       os.path.join(table_dir, UNPARTITIONED_FILE_NAME))
+
+
+def list_genres(table, root):
+    """
+    :param str table: Name of the table.
+    :param str root: Root directory of the dataset store.
+    :return: Genres that a partitioned table has data for.
+    :rtype: list
+    """
+    return sorted(unquote(file_name[:-len('.parquet')]) for file_name in os.listdir(_table_dir(root, table))
+                  if file_name.endswith('.parquet') and file_name != UNPARTITIONED_FILE_NAME)
+
+
+def load_table(table, root, columns=None, genres=None, memory_map=True):
+    """
+    Loads a table persisted with `save_table`. Only the requested columns and genres are read from disk.
+
+    :param str table: Name of the table.
+    :param str root: Root directory of the dataset store.
+    :param list columns: Columns to load. Defaults to every column.
+    :param list genres: Genres to load, for tables partitioned by genre. Defaults to every genre.
+    :param bool memory_map: Whether to memory-map files instead of reading them into buffers first.
+    :return: Table with its schema's compact dtypes.
+    :rtype: pandas.DataFrame
+    """
+    table_dir = _table_dir(root, table)
+    unpartitioned_path = os.path.join(table_dir, UNPARTITIONED_FILE_NAME)
+    if os.path.exists(unpartitioned_path):
+        paths = [unpartitioned_path]
+    else:
+        paths = [_partition_path(root, table, genre) for genre in (genres or list_genres(table, root))]
+
+    arrow_tables = [pq.read_table(path, columns=columns, memory_map=memory_map) for path in paths]
+    df = pa.concat_tables(arrow_tables).to_pandas() if arrow_tables else pd.DataFrame(columns=columns)
+
+    # categories can differ between genre files, so make sure categorical columns survived the concatenation
+    return apply_schema(df, table)
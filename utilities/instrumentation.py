@@ -0,0 +1,250 @@
+"""
+Contains lightweight, always-on instrumentation: timers for hot functions and code blocks, counters (e.g. of outbound
+Spotify/Pitchfork calls per endpoint), and exporters that write the collected metrics in Prometheus text format or as
+JSON lines, so that production runs can be profiled without attaching a profiler.
+
+Usage:
+    @timed
+    def get_album_rating(...): ...
+
+    with timer('app.predict'):
+        popularity = model.predict(features)
+
+    increment('outbound_calls', endpoint='spotify_search')
+    export_metrics('metrics.prom')      # or 'metrics.jsonl'
+"""
+import os
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+
+# environment variable naming a file that `export_metrics` writes to when no path is given
+METRICS_PATH_ENV = 'POPULARITY_METRICS_PATH'
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of timers (count, total and maximum seconds per name) and labelled counters.
+    """
+
+    def __init__(self, namespace='popularity'):
+        """
+        :param str namespace: Prefix of metric names in the Prometheus export.
+        """
+        self.namespace = namespace
+        self.enabled = True
+        self._timers = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        """
+        Records one timing.
+
+        :param str name: Name of the timed function or block, e.g. 'app.predict'.
+        :param float seconds: Duration.
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            stats = self._timers.get(name)
+            if stats is None:
+                self._timers[name] = stats = {'count': 0, 'sum_seconds': 0.0, 'max_seconds': 0.0}
+            stats['count'] += 1
+            stats['sum_seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+
+    def increment(self, name, amount=1, **labels):
+        """
+        Increments a counter.
+
+        :param str name: Name of the counter, e.g. 'outbound_calls'.
+        :param int amount: Amount to increment by.
+        :param labels: Labels distinguishing series of the counter, e.g. endpoint='spotify_search'.
+        """
+        if not self.enabled:
+            return
+
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, name):
+        """
+        Context manager that times the block it wraps, including blocks that raise.
+
+        :param str name: Name of the timed block.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def timed(self, name=None):
+        """
+        Decorator that times every call of a function. Can be used as `@timed` or `@timed('custom.name')`.
+
+        :param str name: Name to record timings under. Defaults to '<module>.<function>', e.g.
+                         'data_acquisition_utilities.get_album_rating'.
+        :return: Decorated function, or a decorator if a name was given.
+        """
+        if callable(name):
+            return self.timed()(name)
+
+        def decorator(function):
+            timer_name = name or f"{function.__module__.split('.')[-1]}.{function.__qualname__}"
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe(timer_name, time.perf_counter() - start)
+
+            return wrapper
+
+        return decorator
+
+    def snapshot(self):
+        """
+        :return: Copy of every timer, by name, and every counter, as dictionaries of name, labels and value.
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'timers': {name: dict(stats) for name, stats in sorted(self._timers.items())},
+                'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                             for (name, labels), value in sorted(self._counters.items())]
+            }
+
+    def reset(self):
+        """
+        Removes every timer and counter.
+        """
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+
+    def to_prometheus(self):
+        """
+        Renders the metrics in the Prometheus text exposition format. Timers become one summary (count and sum) plus a
+        max gauge, labelled by name; each counter becomes a counter of its own.
+
+        :return: Metrics in Prometheus text format.
+        :rtype: str
+        """
+        snapshot = self.snapshot()
+        duration = f'{self.namespace}_duration_seconds'
+        lines = [f'# HELP {duration} Time spent in instrumented functions and blocks.', f'# TYPE {duration} summary']
+        for name, stats in snapshot['timers'].items():
+            labels = _prometheus_labels({'name': name})
+            lines.append(f"{duration}_count{labels} {stats['count']}")
+            lines.append(f"{duration}_sum{labels} {stats['sum_seconds']:.9f}")
+        lines += [f'# HELP {duration}_max Longest single duration.', f'# TYPE {duration}_max gauge']
+        for name, stats in snapshot['timers'].items():
+            lines.append(f"{duration}_max{_prometheus_labels({'name': name})} {stats['max_seconds']:.9f}")
+
+        counter_names = sorted({counter['name'] for counter in snapshot['counters']})
+        for counter_name in counter_names:
+            metric = f'{self.namespace}_{counter_name}_total'
+            lines.append(f'# TYPE {metric} counter')
+            for counter in snapshot['counters']:
+                if counter['name'] == counter_name:
+                    lines.append(f"{metric}{_prometheus_labels(counter['labels'])} {counter['value']}")
+
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """
+        Writes the metrics in Prometheus text format, replacing the file atomically so that a collector (e.g. the node
+        exporter's textfile collector) never reads a partial file.
+
+        :param str path: Path to write to, e.g. 'metrics.prom'.
+        """
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(self.to_prometheus())
+        os.replace(temp_path, path)
+
+    def write_json_lines(self, path, **context):
+        """
+        Appends the current metrics as one JSON line, stamped with the time, so that a file accumulates a history of
+        snapshots.
+
+        :param str path: Path to append to, e.g. 'metrics.jsonl'.
+        :param context: Extra fields to include in the line, e.g. run='nightly'.
+        """
+        line = dict(context, timestamp=datetime.now(timezone.utc).isoformat(), pid=os.getpid(), **self.snapshot())
+        with self._lock, open(path, 'a') as f:
+            f.write(json.dumps(line) + '\n')
+
+
+def _prometheus_labels(labels):
+    """
+    :param dict labels: Label names and values.
+    :return: Labels in Prometheus text format, e.g. '{endpoint="spotify_search"}', or '' if there are none.
+    :rtype: str
+    """
+    if not labels:
+        return ''
+    escaped = {key: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for key, value in labels.items()}
+
+    return '{' + ','.join(f'{key}="{value}"' for key, value in sorted(escaped.items())) + '}'
+
+
+# registry shared by the whole process
+METRICS = MetricsRegistry()
+
+timed = METRICS.timed
+timer = METRICS.timer
+increment = METRICS.increment
+
+
+def outbound_call(endpoint, fetch):
+    """
+    Makes an outbound call (an HTTP request to Spotify or Pitchfork), counting it and timing it per endpoint.
+
+    :param str endpoint: Name of the endpoint, e.g. 'spotify_search'.
+    :param callable fetch: Function without arguments that makes the call.
+    :return: Result of fetch.
+    """
+    increment('outbound_calls', endpoint=endpoint)
+    try:
+        with timer(f'outbound.{endpoint}'):
+            return fetch()
+    except Exception:
+        increment('outbound_errors', endpoint=endpoint)
+        raise
+
+
+def export_metrics(path=None, **context):
+    """
+    Writes the process-wide metrics to a file: Prometheus text format for .prom/.txt files, JSON lines otherwise.
+
+    :param str path: Path to write to. Defaults to the POPULARITY_METRICS_PATH environment variable; if that isn't set
+                     either, nothing is written.
+    :param context: Extra fields to include in JSON lines output.
+    """
+    path = path or os.environ.get(METRICS_PATH_ENV)
+    if not path:
+        return
+
+    if path.endswith(('.prom', '.txt')):
+        METRICS.write_prometheus(path)
+    else:
+        METRICS.write_json_lines(path, **context)
@@ -0,0 +1,195 @@
+"""
+Contains a dependency-light scorer for the deployed linear model. `export_linear_model` turns a pickled scikit-learn
+model (e.g. `data/final_model.pkl`, a StandardScaler + Lasso pipeline) into a small, versioned JSON file of
+coefficients, and `LinearScorer` scores features from that file using only NumPy, so serving doesn't need to import
+scikit-learn/joblib or unpickle anything.
+"""
+import json
+import hashlib
+import numpy as np
+
+
+# bump whenever the layout of the exported JSON file changes
+FORMAT_VERSION = 1
+
+
+class LinearScorer:
+    """
+    Pure-NumPy equivalent of `StandardScaler` followed by a linear model's `predict`. The scaler is folded into the
+    coefficients at construction time, so scoring is a single matrix-vector product.
+    """
+
+    def __init__(self, coef, intercept, mean=None, scale=None, feature_names=None, metadata=None):
+        """
+        :param list coef: Linear model coefficients, one per feature (in scaled feature space, if a scaler was used).
+        :param float intercept: Linear model intercept.
+        :param list mean: Per-feature means subtracted by the scaler, or None if features weren't centered.
+        :param list scale: Per-feature scales divided by the scaler, or None if features weren't scaled.
+        :param list feature_names: Names of the features, in order.
+        :param dict metadata: Additional information about the exported model (e.g. source file digest).
+        """
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.mean = None if mean is None else np.asarray(mean, dtype=np.float64)
+        self.scale = None if scale is None else np.asarray(scale, dtype=np.float64)
+        self.feature_names = feature_names
+        self.metadata = metadata or {}
+
+        # fold scaling into the coefficients: ((X - mean) / scale) @ coef + b == X @ (coef / scale) + b'
+        weights = self.coef if self.scale is None else self.coef / self.scale
+        bias = self.intercept if self.mean is None else self.intercept - float(self.mean @ weights)
+        self._weights = weights
+        self._bias = bias
+
+    @property
+    def n_features(self):
+        return len(self.coef)
+
+    def predict(self, X):
+        """
+        Predicts targets for a feature matrix.
+
+        :param X: Feature matrix of shape (n_rows, n_features), or a single row of shape (n_features,).
+        :return: Predictions of shape (n_rows,).
+        :rtype: numpy.ndarray
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f'Expected {self.n_features} features, got {X.shape[1]}.')
+
+        return X @ self._weights + self._bias
+
+    def to_dict(self):
+        """
+        :return: JSON-serializable representation of the scorer.
+        :rtype: dict
+        """
+        return {
+            'format_version': FORMAT_VERSION,
+            'feature_names': self.feature_names,
+            'coef': self.coef.tolist(),
+            'intercept': self.intercept,
+            'scaler': None if self.mean is None and self.scale is None else {
+                'mean': None if self.mean is None else self.mean.tolist(),
+                'scale': None if self.scale is None else self.scale.tolist()
+            },
+            'metadata': self.metadata
+        }
+
+    def save(self, path):
+        """
+        Writes the scorer to a JSON file.
+
+        :param str path: Path to write JSON file to.
+        """
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a scorer from a JSON file written by `LinearScorer.save` or `export_linear_model`.
+
+        :param str path: Path to JSON file.
+        :return: Scorer.
+        :rtype: LinearScorer
+        """
+        with open(path) as f:
+            params = json.load(f)
+
+        if params.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported coefficients file version {params.get('format_version')} in {path}, "
+                             f"expected {FORMAT_VERSION}. Re-export the model.")
+
+        scaler = params.get('scaler') or {}
+        return cls(coef=params['coef'], intercept=params['intercept'], mean=scaler.get('mean'),
+                   scale=scaler.get('scale'), feature_names=params.get('feature_names'),
+                   metadata=params.get('metadata'))
+
+
+def extract_linear_parameters(model):
+    """
+    Extracts coefficients and scaler parameters from a fitted scikit-learn linear model, or from a Pipeline consisting of
+    an optional StandardScaler followed by a linear model.
+
+    :param object model: Fitted scikit-learn model.
+    :return: Keyword arguments for `LinearScorer`: coef, intercept, mean and scale.
+    :rtype: dict
+    """
+    steps = [step for _, step in model.steps] if hasattr(model, 'steps') else [model]
+    *transformers, estimator = steps
+
+    mean, scale = None, None
+    if len(transformers) > 1:
+        raise ValueError('Only a single StandardScaler step is supported before the linear model.')
+    elif transformers:
+        scaler = transformers[0]
+        if not hasattr(scaler, 'scale_') or not hasattr(scaler, 'mean_'):
+            raise ValueError(f'Unsupported preprocessing step {type(scaler).__name__}, expected StandardScaler.')
+        mean, scale = scaler.mean_, scaler.scale_
+
+    if np.ndim(estimator.coef_) > 1 and np.shape(estimator.coef_)[0] > 1:
+        raise ValueError('Only single-target linear models are supported.')
+
+    return {'coef': np.ravel(estimator.coef_), 'intercept': float(np.ravel(estimator.intercept_)[0]), 'mean': mean,
+            'scale': scale}
+
+
+def check_parity(model, scorer, X=None, n_samples=10000, atol=1e-8, random_state=0):
+    """
+    Confirms that a scorer reproduces `model.predict` to within float tolerance.
+
+    :param object model: Fitted scikit-learn model.
+    :param LinearScorer scorer: Scorer exported from `model`.
+    :param numpy.ndarray X: Features to compare predictions on. Defaults to random rows covering the app's input ranges
+                            ([mode, danceability, energy, speechiness, valence, log_followers]).
+    :param int n_samples: Number of random rows to generate if X isn't given.
+    :param float atol: Maximum allowed absolute difference between predictions.
+    :param int random_state: Seed for generating random rows.
+    :return: Maximum absolute difference between predictions.
+    :rtype: float
+    """
+    if X is None:
+        rng = np.random.RandomState(random_state)
+        X = rng.uniform(0, 1, size=(n_samples, scorer.n_features))
+        X[:, 0] = rng.randint(0, 2, size=n_samples)
+        X[:, -1] = np.log(rng.uniform(1, 1e7, size=n_samples))
+
+    max_difference = float(np.max(np.abs(model.predict(X) - scorer.predict(X))))
+    if max_difference > atol:
+        raise ValueError(f'Exported scorer differs from model by up to {max_difference}, tolerance is {atol}.')
+
+    return max_difference
+
+
+def export_linear_model(model_path, output_path, feature_names=None, atol=1e-8):
+    """
+    Exports a pickled scikit-learn linear model to a versioned JSON coefficients file, after checking that the exported
+    scorer matches the model's predictions.
+
+    :param str model_path: Path to pickled model (e.g. `data/final_model.pkl`).
+    :param str output_path: Path to write JSON coefficients file to.
+    :param list feature_names: Names of the model's features, in order.
+    :param float atol: Maximum allowed absolute difference between model and scorer predictions.
+    :return: Exported scorer.
+    :rtype: LinearScorer
+    """
+    from joblib import load
+
+    model = load(model_path)
+    with open(model_path, 'rb') as f:
+        model_digest = hashlib.sha256(f.read()).hexdigest()
+
+    steps = [step for _, step in model.steps] if hasattr(model, 'steps') else [model]
+    metadata = {
+        'source': model_digest,
+        'estimator': type(steps[-1]).__name__,
+        'sklearn_version': getattr(steps[-1], '_sklearn_version', None)
+    }
+    scorer = LinearScorer(feature_names=feature_names, metadata=metadata, **extract_linear_parameters(model))
+    check_parity(model, scorer, atol=atol)
+    scorer.save(output_path)
+
+    return scorer
@@ -0,0 +1,176 @@
+"""
+Contains a process-wide registry for trained model artifacts (e.g. `data/final_model.pkl`). Each artifact is unpickled
+once per process and shared by every caller (and every Streamlit session), and is only reloaded when the file on disk
+changes.
+"""
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class ModelRegistry:
+    """
+    Least-recently-used cache of loaded model artifacts, keyed by absolute file path. Several model versions (i.e.
+    several artifact files) can be held at once; once more than `max_models` are loaded, the least recently used one is
+    evicted.
+
+    An artifact is considered stale when its modification time or size changes. If `verify_hash` is set, a stale
+    artifact is only reloaded when its SHA-256 digest also changed, which avoids needless reloads when a file is merely
+    touched or re-copied.
+    """
+
+    def __init__(self, max_models=4, verify_hash=False):
+        """
+        :param int max_models: Maximum number of model artifacts to keep loaded at once.
+        :param bool verify_hash: Whether to compare file digests before reloading an artifact whose mtime changed.
+        """
+        if max_models < 1:
+            raise ValueError('max_models must be at least 1.')
+
+        self.max_models = max_models
+        self.verify_hash = verify_hash
+        self._models = OrderedDict()
+        self._unload_callbacks = []
+        self._lock = threading.RLock()
+
+    def add_unload_callback(self, callback):
+        """
+        Registers a function to call whenever a loaded model is dropped from the registry (reloaded because its file
+        changed, evicted, or cleared), e.g. to clear caches that would otherwise keep old models in memory.
+
+        :param callable callback: Function without arguments.
+        """
+        with self._lock:
+            self._unload_callbacks.append(callback)
+
+    def _unloaded(self):
+        for callback in self._unload_callbacks:
+            callback()
+
+    def get(self, path, loader=None):
+        """
+        Returns the model stored at `path`, loading it only if it isn't cached or has changed on disk.
+
+        :param str path: Path to the model artifact.
+        :param callable loader: Function that takes a path and returns a model. Defaults to `joblib.load`.
+        :return: Loaded model.
+        :rtype: object
+        """
+        loader = loader or _joblib_load
+        key = os.path.abspath(path)
+        stat = os.stat(key)
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None and entry['loader'] == loader:
+                if entry['signature'] == signature:
+                    self._models.move_to_end(key)
+                    return entry['model']
+                if self.verify_hash and entry['digest'] == _file_digest(key):
+                    entry['signature'] = signature
+                    self._models.move_to_end(key)
+                    return entry['model']
+
+            model = loader(key)
+            self._models[key] = {
+                'model': model,
+                'loader': loader,
+                'signature': signature,
+                'digest': _file_digest(key) if self.verify_hash else None
+            }
+            self._models.move_to_end(key)
+
+            # evict least recently used models
+            num_unloaded = 0 if entry is None else 1
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+                num_unloaded += 1
+            if num_unloaded:
+                self._unloaded()
+
+            return model
+
+    def evict(self, path):
+        """
+        Removes a model from the registry, if it is loaded.
+
+        :param str path: Path to the model artifact.
+        """
+        with self._lock:
+            if self._models.pop(os.path.abspath(path), None) is not None:
+                self._unloaded()
+
+    def clear(self):
+        """
+        Removes all models from the registry.
+        """
+        with self._lock:
+            if self._models:
+                self._models.clear()
+                self._unloaded()
+
+    def loaded_paths(self):
+        """
+        :return: Absolute paths of the currently loaded artifacts, from least to most recently used.
+        :rtype: list
+        """
+        with self._lock:
+            return list(self._models.keys())
+
+    def __contains__(self, path):
+        with self._lock:
+            return os.path.abspath(path) in self._models
+
+    def __len__(self):
+        with self._lock:
+            return len(self._models)
+
+
+def _joblib_load(path):
+    """
+    Loads a pickled model with joblib. joblib (and scikit-learn, when unpickling its models) is only imported the first
+    time a pickled model is actually loaded, so importing this module stays cheap.
+
+    :param str path: Path to pickled model.
+    :return: Loaded model.
+    :rtype: object
+    """
+    from joblib import load
+
+    return load(path)
+
+
+def _file_digest(path, block_size=1 << 20):
+    """
+    Computes the SHA-256 digest of a file without reading it into memory all at once.
+
+    :param str path: Path to file.
+    :param int block_size: Number of bytes to read at a time.
+    :return: Hex digest of file contents.
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+# registry shared by the whole process. Streamlit re-executes app.py on every rerun, but imported modules persist, so
+# models held here survive across reruns and sessions.
+MODEL_REGISTRY = ModelRegistry()
+
+
+def load_model(path, loader=None):
+    """
+    Loads a model artifact through the process-wide registry.
+
+    :param str path: Path to the model artifact.
+    :param callable loader: Function that takes a path and returns a model. Defaults to `joblib.load`.
+    :return: Loaded model.
+    :rtype: object
+    """
+    return MODEL_REGISTRY.get(path, loader=loader)
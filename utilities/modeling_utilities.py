@@ -2,33 +2,191 @@
 Contains utility functions necessary to analyze and build a model.
 Author: Stephen Kaplan (July 13, 2020)
 """
+import os
+import time
+import multiprocessing
 import seaborn as sns
 import matplotlib.pyplot as plt
 from math import sqrt
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
+import pandas as pd
 
-from sklearn.linear_model import LinearRegression
+from joblib import dump
+from sklearn.base import clone
+from sklearn.linear_model import LinearRegression, Lasso, lasso_path
+from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_squared_error
 from sklearn.model_selection import train_test_split, cross_val_score, KFold
 
+from utilities.instrumentation import timed
+
 
 ALL_GENRES = ['Electronic', 'Experimental', 'Folk/Country', 'Global', 'Jazz', 'Metal', 'Pop/R&B', 'Rap/Hip-Hop', 'Rock']
 
 
-def pair_plot_for_music_genre(data, genre):
+def pair_plot_for_music_genre(data, genre, max_points=None, stratify_by=None, density=False, bins=50, random_state=0):
     """
     Filters data by genre and plots pair plot of all columns.
 
+    For large datasets, either limit the number of points scattered with `max_points` (a random sample, stratified by
+    `stratify_by` if given), or set `density` to draw every track as binned 2D histograms instead of scatter plots.
+
     :param pandas.DataFrame data: Pandas DataFrame with a format specific to `FINAL EDA & Modeling Workbook (Project V2).ipynb`.
     :param str genre: Genre of music to show pair plot for. Must be in ALL_GENRES variable defined in this file.
+    :param int max_points: Maximum number of tracks to scatter. Defaults to all of them. Ignored if density is set.
+    :param str stratify_by: Column to stratify the sample by (in quantile bins), so that the sample keeps its
+                            distribution, e.g. 'Popularity'. Defaults to a simple random sample.
+    :param bool density: Draw 2D histograms (log-scaled counts) instead of scatter plots.
+    :param int bins: Number of bins per column, if density is set.
+    :param int random_state: Seed for the sample.
+    :return: Figure containing the pair plot.
+    :rtype: matplotlib.figure.Figure
     """
-    df = data[data[genre] == 1]
-    df.drop(ALL_GENRES, axis=1, inplace=True)
-    sns.pairplot(df, kind='scatter', plot_kws={'alpha': 0.1})
-    plt.title(genre)
+    df = _genre_pair_plot_data(data, genre, None if density else max_points, stratify_by, random_state)
+
+    return _draw_pair_plot(df, genre, density, bins)
+
+
+def _genre_pair_plot_data(data, genre, max_points=None, stratify_by=None, random_state=0):
+    """
+    Selects a genre's tracks (optionally downsampled) and every column other than the genre indicators, in a single
+    copy.
+
+    :return: Rows and columns to plot.
+    :rtype: pandas.DataFrame
+    """
+    positions = np.flatnonzero(data[genre].values == 1)
+    if max_points is not None and len(positions) > max_points:
+        strata_values = data[stratify_by].values[positions] if stratify_by is not None else None
+        rng = np.random.RandomState(random_state)
+        positions = positions[_downsample_positions(len(positions), max_points, rng, strata_values)]
+
+    columns = [column for column in data.columns if column not in ALL_GENRES]
+
+    return data.iloc[positions, data.columns.get_indexer(columns)]
+
+
+def _downsample_positions(num_rows, num_samples, rng, strata_values=None, num_strata=10):
+    """
+    Samples row positions without replacement. If strata values are given, rows are split into quantile bins of them
+    and each bin is sampled in proportion to its size (at least one row per bin), which keeps the tails of the
+    distribution that a simple random sample of a small fraction can miss.
+
+    :return: Sorted positions of the sampled rows.
+    :rtype: numpy.ndarray
+    """
+    if strata_values is None:
+        return np.sort(rng.choice(num_rows, num_samples, replace=False))
+
+    strata_values = np.asarray(strata_values, dtype=np.float64)
+    edges = np.unique(np.nanquantile(strata_values, np.linspace(0, 1, num_strata + 1)))
+    strata = np.searchsorted(edges[1:-1], strata_values, side='right')      # missing values go in the last bin
+    order = np.argsort(strata, kind='stable')
+    counts = np.bincount(strata)
+    quotas = np.minimum(counts, np.maximum(1, counts * num_samples // num_rows))
+
+    sampled, start = [], 0
+    for count, quota in zip(counts, quotas):
+        if count:
+            sampled.append(rng.choice(order[start:start + count], quota, replace=False))
+        start += count
 
+    return np.sort(np.concatenate(sampled))
 
+
+def _draw_pair_plot(df, title, density=False, bins=50):
+    """
+    Draws a pair plot of every numeric column, as scatter plots, or as 2D histograms computed with NumPy binning.
+
+    :return: Figure containing the pair plot.
+    :rtype: matplotlib.figure.Figure
+    """
+    if not density:
+        grid = sns.pairplot(df, kind='scatter', plot_kws={'alpha': 0.1})
+        grid.fig.suptitle(title, y=1.02)
+        return grid.fig
+
+    columns = list(df.select_dtypes('number').columns)
+    values = np.asarray(df[columns], dtype=np.float64)
+    finite = np.isfinite(values)
+    edges = [np.histogram_bin_edges(values[finite[:, i], i], bins=bins) for i in range(len(columns))]
+
+    fig, axes = plt.subplots(len(columns), len(columns), figsize=(2 * len(columns), 2 * len(columns)), squeeze=False)
+    for i, y_column in enumerate(columns):
+        for j, x_column in enumerate(columns):
+            ax = axes[i, j]
+            if i == j:
+                counts, _ = np.histogram(values[finite[:, j], j], bins=edges[j])
+                ax.bar(edges[j][:-1], counts, width=np.diff(edges[j]), align='edge')
+            else:
+                mask = finite[:, i] & finite[:, j]
+                counts, _, _ = np.histogram2d(values[mask, j], values[mask, i], bins=[edges[j], edges[i]])
+                ax.pcolormesh(edges[j], edges[i], np.log1p(counts.T), cmap='viridis')
+            if i == len(columns) - 1:
+                ax.set_xlabel(x_column)
+            else:
+                ax.set_xticklabels([])
+            if j == 0:
+                ax.set_ylabel(y_column)
+            else:
+                ax.set_yticklabels([])
+    fig.suptitle(title)
+
+    return fig
+
+
+def _save_pair_plot(df, genre, path, density, bins, dpi):
+    """
+    Draws a pair plot and saves it to an image file. Runs in a worker process.
+
+    :return: Path of the image.
+    :rtype: str
+    """
+    if multiprocessing.current_process().name != 'MainProcess':
+        # render off-screen in workers, whatever backend the parent process uses
+        plt.switch_backend('Agg')
+    fig = _draw_pair_plot(df, genre, density, bins)
+    fig.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+
+    return path
+
+
+@timed
+def save_genre_pair_plots(data, output_dir, genres=ALL_GENRES, max_points=None, stratify_by=None, density=False,
+                          bins=50, random_state=0, n_jobs=4, image_format='png', dpi=100):
+    """
+    Saves a pair plot for each genre (see `pair_plot_for_music_genre`) to an image file, rendering genres in parallel
+    across processes. Each worker is only sent its genre's (downsampled) rows.
+
+    :param pandas.DataFrame data: Pandas DataFrame in the same format as for `pair_plot_for_music_genre`.
+    :param str output_dir: Directory to save images to, as '<genre>.<image_format>' ('/' in genres becomes '-').
+    :param list genres: Genres to plot.
+    :param int max_points: Maximum number of tracks to scatter per genre. Ignored if density is set.
+    :param str stratify_by: Column to stratify samples by.
+    :param bool density: Draw 2D histograms instead of scatter plots.
+    :param int bins: Number of bins per column, if density is set.
+    :param int random_state: Seed for the samples.
+    :param int n_jobs: Number of processes. None renders in this process; -1 uses every core, which can run out of
+                       memory, since each process holds its own figures and genre data.
+    :param str image_format: Image file format, e.g. 'png' or 'svg'.
+    :param int dpi: Resolution of the images.
+    :return: Paths of the images, in the same order as genres.
+    :rtype: list
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    plot_args = []
+    for genre in genres:
+        df = _genre_pair_plot_data(data, genre, None if density else max_points, stratify_by, random_state)
+        path = os.path.join(output_dir, f"{genre.replace('/', '-')}.{image_format}")
+        plot_args.append((df, genre, path, density, bins, dpi))
+
+    return _run_parallel(_save_pair_plot, plot_args, n_jobs)
+
+
+@timed
 def score_baseline_linear_regression_model(X, y):
     """
     For a set of features and target X, y, perform a 80/20 train/val split,
@@ -61,6 +219,183 @@ def score_baseline_linear_regression_model(X, y):
         print(feature, ':', f'{coef:.2f}')
 
 
+class CrossValidationResults:
+    """
+    Per-fold results of `cross_validate`.
+
+    :ivar pandas.DataFrame folds: One row per fold, with the repeat and fold number, train and validation R2, validation
+                                  RMSE, and seconds spent fitting and scoring.
+    :ivar pandas.DataFrame coefficients: One row per fold, with the fitted coefficient of each feature (empty if the
+                                         estimator has no `coef_`).
+    """
+
+    def __init__(self, folds, coefficients):
+        self.folds = folds
+        self.coefficients = coefficients
+
+    @property
+    def r2_train(self):
+        return self.folds['R2 Train'].mean()
+
+    @property
+    def r2_val(self):
+        return self.folds['R2 Val'].mean()
+
+    @property
+    def rmse(self):
+        return self.folds['RMSE'].mean()
+
+    def summary(self):
+        """
+        :return: Mean and standard deviation of every per-fold metric.
+        :rtype: pandas.DataFrame
+        """
+        return self.folds.drop(['Repeat', 'Fold'], axis=1).agg(['mean', 'std'])
+
+    def report(self, show_coefficients=True):
+        """
+        Prints average scores and, optionally, average coefficients across folds.
+
+        :param bool show_coefficients: Whether to print coefficients.
+        """
+        print(f'R2 Train Avg: {self.r2_train}')
+        print(f'R2 Val Avg: {self.r2_val}')
+        print(f'RMSE Avg: {self.rmse}')
+        if show_coefficients and not self.coefficients.empty:
+            print('----Coefficients----')
+            for col, coef in self.coefficients.mean().items():
+                print(f'{col}: {coef}')
+
+
+def _take(data, indices):
+    """
+    Selects rows by position from a pandas object or a numpy array.
+    """
+    return data.iloc[indices] if hasattr(data, 'iloc') else data[indices]
+
+
+def _kfold_splits(X, y, cv, n_repeats, random_state):
+    """
+    Generates shuffled k-fold splits, repeated `n_repeats` times with different shuffles.
+
+    :return: (repeat, fold, train indices, validation indices) tuples.
+    :rtype: list
+    """
+    rng = np.random.RandomState(random_state)
+    splits = []
+    for repeat in range(n_repeats):
+        kf = KFold(n_splits=cv, shuffle=True, random_state=rng.randint(np.iinfo(np.int32).max))
+        splits.extend((repeat, fold, train_ind, val_ind)
+                      for fold, (train_ind, val_ind) in enumerate(kf.split(X, y)))
+
+    return splits
+
+
+# arguments shared by every call in a worker process of `_run_parallel`, set once per worker by its initializer
+_worker_shared_args = ()
+
+
+def _set_worker_shared_args(*shared_args):
+    global _worker_shared_args
+    _worker_shared_args = shared_args
+
+
+def _call_with_shared_args(function, *args):
+    return function(*_worker_shared_args, *args)
+
+
+def _run_parallel(function, call_args, n_jobs, shared_args=()):
+    """
+    Calls `function(*shared_args, *args)` once per tuple of arguments (e.g. once per cross validation fold, or per
+    plot), either in this process or across a process pool. Shared arguments (e.g. the full X and y) are sent to each
+    worker process once, when it starts, rather than pickled again for every call; only the per-call arguments (e.g.
+    fold indices) are sent with each call.
+
+    :param callable function: Module-level (i.e. picklable) function to call.
+    :param list call_args: Tuple of arguments for each call.
+    :param int n_jobs: Number of processes. None runs calls in this process; -1 uses every core.
+    :param tuple shared_args: Leading arguments that are the same for every call.
+    :return: Results of each call, in the same order as call_args.
+    :rtype: list
+    """
+    if n_jobs is None or n_jobs == 1:
+        return [function(*shared_args, *args) for args in call_args]
+
+    max_workers = os.cpu_count() if n_jobs == -1 else n_jobs
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_set_worker_shared_args,
+                             initargs=shared_args) as executor:
+        futures = [executor.submit(_call_with_shared_args, function, *args) for args in call_args]
+        return [future.result() for future in futures]
+
+
+def _fit_and_score_fold(X, y, estimator, train_ind, val_ind, scale):
+    """
+    Fits a fresh copy of an estimator on one fold's training data and scores it on the fold's validation data.
+
+    :return: Train and validation R2, validation RMSE, fit and score times, and coefficients.
+    :rtype: dict
+    """
+    X_train, y_train = _take(X, train_ind), _take(y, train_ind)
+    X_val, y_val = _take(X, val_ind), _take(y, val_ind)
+
+    if scale:
+        scaler = StandardScaler()
+        X_train = scaler.fit_transform(X_train)
+        X_val = scaler.transform(X_val)
+
+    estimator = clone(estimator)
+    start = time.perf_counter()
+    estimator.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    r2_train = estimator.score(X_train, y_train)
+    r2_val = estimator.score(X_val, y_val)
+    rmse = sqrt(mean_squared_error(y_val, estimator.predict(X_val)))
+    score_seconds = time.perf_counter() - start
+
+    return {
+        'R2 Train': r2_train,
+        'R2 Val': r2_val,
+        'RMSE': rmse,
+        'Fit Seconds': fit_seconds,
+        'Score Seconds': score_seconds,
+        'coef': np.ravel(estimator.coef_) if hasattr(estimator, 'coef_') else None
+    }
+
+
+@timed
+def cross_validate(X, y, estimator, cv=5, n_repeats=1, random_state=None, n_jobs=None, scale=True):
+    """
+    Performs (repeated) k-fold cross validation, standard scaling features within each fold, and returns per-fold
+    results. Folds can be run in parallel across processes.
+
+    :param X: Features, as a pandas DataFrame or numpy array (e.g. polynomial features).
+    :param y: Targets, as a pandas Series or numpy array.
+    :param estimator: scikit-learn model such as LinearRegression. Not modified; each fold fits a clone.
+    :param int cv: Number of K-Folds for cross validation.
+    :param int n_repeats: Number of times to repeat cross validation, each time with differently shuffled folds.
+    :param int random_state: Seed for shuffling folds, for reproducible results. Defaults to different folds each call.
+    :param int n_jobs: Number of processes to run folds in. None runs folds in this process; -1 uses every core.
+    :param bool scale: Whether to standard scale features (fit on each fold's training data).
+    :return: Per-fold scores, timings and coefficients.
+    :rtype: CrossValidationResults
+    """
+    splits = _kfold_splits(X, y, cv, n_repeats, random_state)
+    fold_results = _run_parallel(_fit_and_score_fold, [(estimator, train_ind, val_ind, scale)
+                                                        for _, _, train_ind, val_ind in splits], n_jobs,
+                                 shared_args=(X, y))
+
+    folds = pd.DataFrame([{'Repeat': repeat, 'Fold': fold, **{k: v for k, v in result.items() if k != 'coef'}}
+                          for (repeat, fold, _, _), result in zip(splits, fold_results)])
+
+    coefs = [result['coef'] for result in fold_results if result['coef'] is not None]
+    feature_names = X.columns if hasattr(X, 'columns') else [f'x{i}' for i in range(np.shape(X)[1])]
+    coefficients = pd.DataFrame(coefs, columns=feature_names) if coefs else pd.DataFrame()
+
+    return CrossValidationResults(folds, coefficients)
+
+
 def manual_cross_validate(X, y, estimator, cv=5):
     """
     Performs a k-fold cross validation on a trained model and reports results.
@@ -70,27 +405,7 @@ def manual_cross_validate(X, y, estimator, cv=5):
     :param estimator: scikit-learn model such as LinearRegression
     :param int cv: Number of K-Folds for cross validation.
     """
-    kf = KFold(n_splits=cv, shuffle=True)
-    r2_train, r2_val, rmse = [], [], []
-    for train_ind, val_ind in kf.split(X, y):
-        X_train, y_train = X.iloc[train_ind], y.iloc[train_ind]
-        X_val, y_val = X.iloc[val_ind], y.iloc[val_ind]
-
-        scaler = StandardScaler()
-        X_train_scaled = scaler.fit_transform(X_train)
-        X_val_scaled = scaler.transform(X_val)
-
-        estimator.fit(X_train_scaled, y_train)
-        r2_train.append(estimator.score(X_train_scaled, y_train))
-        r2_val.append(estimator.score(X_val_scaled, y_val))
-        rmse.append(sqrt(mean_squared_error(y_val, estimator.predict(X_val_scaled))))
-
-    print(f'R2 Train Avg: {np.mean(r2_train)}')
-    print(f'R2 Val Avg: {np.mean(r2_val)}')
-    print(f'RMSE Avg: {np.mean(rmse)}')
-    print('----Coefficients----')
-    for coef, col in zip(estimator.coef_, X.columns):
-        print(f'{col}: {coef}')
+    cross_validate(X, y, estimator, cv=cv).report()
 
 
 def manual_cross_validate_poly(X, y, estimator, cv=5):
@@ -102,22 +417,140 @@ def manual_cross_validate_poly(X, y, estimator, cv=5):
     :param estimator: scikit-learn model such as LinearRegression
     :param int cv: Number of K-Folds for cross validation.
     """
-    kf = KFold(n_splits=cv, shuffle=True)
-    r2_train, r2_val, rmse = [], [], []
-    for train_ind, val_ind in kf.split(X, y):
-        # different indexing for polynomial features
-        X_train, y_train = X[train_ind], y.iloc[train_ind]
-        X_val, y_val = X[val_ind], y.iloc[val_ind]
+    cross_validate(X, y, estimator, cv=cv).report(show_coefficients=False)
 
-        scaler = StandardScaler()
-        X_train_scaled = scaler.fit_transform(X_train)
-        X_val_scaled = scaler.transform(X_val)
 
-        estimator.fit(X_train_scaled, y_train)
-        r2_train.append(estimator.score(X_train_scaled, y_train))
-        r2_val.append(estimator.score(X_val_scaled, y_val))
-        rmse.append(sqrt(mean_squared_error(y_val, estimator.predict(X_val_scaled))))
+def lasso_alpha_grid(X, y, n_alphas=100, eps=1e-3):
+    """
+    Computes a descending, log-spaced grid of Lasso alphas, from the smallest alpha that zeroes every coefficient down
+    to `eps` times that (the same grid LassoCV uses, which is how `data/final_model.pkl` was tuned).
+
+    :param X: Features, as a pandas DataFrame or numpy array.
+    :param y: Targets, as a pandas Series or numpy array.
+    :param int n_alphas: Number of alphas.
+    :param float eps: Ratio of the smallest to the largest alpha.
+    :return: Alphas, from largest to smallest.
+    :rtype: numpy.ndarray
+    """
+    X_scaled = StandardScaler().fit_transform(X)
+    y = np.asarray(y, dtype=np.float64)
+    alpha_max = np.max(np.abs(X_scaled.T @ (y - y.mean()))) / len(y)
+
+    return np.logspace(np.log10(alpha_max), np.log10(alpha_max * eps), num=n_alphas)
+
+
+def _score_lasso_path_fold(X, y, train_ind, val_ind, alphas, max_iter, tol):
+    """
+    Fits the whole Lasso regularization path on one fold's (standard scaled) training data and scores every alpha on
+    the fold's validation data. Coordinate descent warm starts each alpha from the previous alpha's solution, so the
+    whole path costs about as much as a few separate fits.
+
+    :return: Validation R2 and RMSE for each alpha.
+    :rtype: tuple
+    """
+    X_train, y_train = _take(X, train_ind), np.asarray(_take(y, train_ind), dtype=np.float64)
+    X_val, y_val = _take(X, val_ind), np.asarray(_take(y, val_ind), dtype=np.float64)
+
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(X_train)
+    X_val = scaler.transform(X_val)
+
+    # lasso_path doesn't fit an intercept. features are already centered, so center the target instead
+    y_mean = y_train.mean()
+    _, coefs, _ = lasso_path(X_train, y_train - y_mean, alphas=alphas, max_iter=max_iter, tol=tol)
+
+    predictions = X_val @ coefs + y_mean        # shape (n_val, n_alphas)
+    residuals = predictions - y_val[:, np.newaxis]
+    sse = np.sum(residuals ** 2, axis=0)
+    r2 = 1 - sse / np.sum((y_val - y_val.mean()) ** 2)
+    rmse = np.sqrt(sse / len(y_val))
+
+    return r2, rmse
+
+
+@timed
+def lasso_path_search(X, y, alphas=None, n_alphas=100, eps=1e-3, cv=5, n_repeats=1, random_state=None, n_jobs=None,
+                      max_iter=1000, tol=1e-4):
+    """
+    Searches for the best Lasso alpha by cross validating the entire regularization path on each fold, rather than
+    refitting from scratch for every alpha. Folds can be run in parallel across processes.
+
+    :param X: Features, as a pandas DataFrame or numpy array.
+    :param y: Targets, as a pandas Series or numpy array.
+    :param list alphas: Alphas to evaluate. Defaults to `lasso_alpha_grid(X, y, n_alphas, eps)`.
+    :param int n_alphas: Number of alphas, if alphas aren't given.
+    :param float eps: Ratio of the smallest to the largest alpha, if alphas aren't given.
+    :param int cv: Number of K-Folds for cross validation.
+    :param int n_repeats: Number of times to repeat cross validation, each time with differently shuffled folds.
+    :param int random_state: Seed for shuffling folds, for reproducible results.
+    :param int n_jobs: Number of processes to run folds in. None runs folds in this process; -1 uses every core.
+    :param int max_iter: Maximum number of coordinate descent iterations per alpha.
+    :param float tol: Coordinate descent tolerance.
+    :return: Mean and standard deviation of validation R2 and RMSE across folds for each alpha, from largest to
+             smallest alpha.
+    :rtype: pandas.DataFrame
+    """
+    if alphas is None:
+        alphas = lasso_alpha_grid(X, y, n_alphas=n_alphas, eps=eps)
+    alphas = np.sort(np.asarray(alphas, dtype=np.float64))[::-1]     # warm starts go from large to small alpha
+
+    splits = _kfold_splits(X, y, cv, n_repeats, random_state)
+    fold_results = _run_parallel(_score_lasso_path_fold, [(train_ind, val_ind, alphas, max_iter, tol)
+                                                          for _, _, train_ind, val_ind in splits], n_jobs,
+                                 shared_args=(X, y))
+    r2 = np.array([fold_r2 for fold_r2, _ in fold_results])            # shape (n_folds, n_alphas)
+    rmse = np.array([fold_rmse for _, fold_rmse in fold_results])
+
+    return pd.DataFrame({
+        'Alpha': alphas,
+        'R2 Val Mean': r2.mean(axis=0),
+        'R2 Val Std': r2.std(axis=0),
+        'RMSE Mean': rmse.mean(axis=0),
+        'RMSE Std': rmse.std(axis=0)
+    })
+
+
+@timed
+def fit_final_lasso_model(X, y, alpha, model_path=None, max_iter=1000, tol=1e-4):
+    """
+    Refits a standard scaled Lasso model on all of the data, in the same format as `data/final_model.pkl` (a Pipeline
+    with 'scaler' and 'lasso' steps), and optionally saves it.
+
+    :param X: Features, as a pandas DataFrame or numpy array.
+    :param y: Targets, as a pandas Series or numpy array.
+    :param float alpha: Lasso alpha, e.g. the best alpha found by `lasso_path_search`.
+    :param str model_path: Path to save the pickled model to. Defaults to not saving.
+    :param int max_iter: Maximum number of coordinate descent iterations.
+    :param float tol: Coordinate descent tolerance.
+    :return: Fitted model.
+    :rtype: sklearn.pipeline.Pipeline
+    """
+    model = Pipeline([('scaler', StandardScaler()), ('lasso', Lasso(alpha=alpha, max_iter=max_iter, tol=tol))])
+    model.fit(X, y)
+    if model_path is not None:
+        dump(model, model_path)
+
+    return model
+
+
+@timed
+def tune_lasso_model(X, y, model_path=None, **search_kwargs):
+    """
+    Runs `lasso_path_search`, picks the alpha with the best mean validation R2, and refits it on all of the data with
+    `fit_final_lasso_model`.
+
+    :param X: Features, as a pandas DataFrame or numpy array.
+    :param y: Targets, as a pandas Series or numpy array.
+    :param str model_path: Path to save the pickled model to (e.g. `data/final_model.pkl`). Defaults to not saving.
+    :param search_kwargs: Keyword arguments for `lasso_path_search`.
+    :return: Alpha-vs-score table, and the refit model.
+    :rtype: tuple
+    """
+    df_alpha_scores = lasso_path_search(X, y, **search_kwargs)
+    best_alpha = df_alpha_scores.loc[df_alpha_scores['R2 Val Mean'].idxmax(), 'Alpha']
+    print(f'Best alpha: {best_alpha}')
+
+    model = fit_final_lasso_model(X, y, best_alpha, model_path=model_path,
+                                  max_iter=search_kwargs.get('max_iter', 1000), tol=search_kwargs.get('tol', 1e-4))
 
-    print(f'R2 Train Avg: {np.mean(r2_train)}')
-    print(f'R2 Val Avg: {np.mean(r2_val)}')
-    print(f'RMSE Avg: {np.mean(rmse)}')
\ No newline at end of file
+    return df_alpha_scores, model
@@ -0,0 +1,370 @@
+"""
+Contains a lightweight JSON HTTP service for popularity predictions, built on the standard library. The model is loaded
+once, and concurrent requests are coalesced into micro-batches, so that a single `predict` call serves many clients.
+Throughput and latency percentiles are exposed for monitoring.
+
+Endpoints:
+    POST /predict   {"mode": 1, "danceability": 0.5, "energy": 0.5, "speechiness": 0.5, "valence": 0.5,
+                     "followers": 500000}, or {"instances": [{...}, ...]} to score several tracks at once.
+    GET /metrics    Request, prediction and batch counts, throughput, and latency percentiles.
+    GET /health     Liveness check.
+"""
+import sys
+import json
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from utilities.serving_utilities import DEFAULT_MODEL_PATH, build_feature_matrix, encode_mode, load_popularity_model
+
+
+# fields of a prediction request, in the argument order of `build_feature_matrix`
+REQUEST_FIELDS = ['mode', 'danceability', 'energy', 'speechiness', 'valence', 'followers']
+
+# maximum size of a request body, in bytes
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+
+class ServiceMetrics:
+    """
+    Thread-safe request, prediction and batch counters, plus a window of recent request latencies for percentiles.
+    """
+
+    def __init__(self, latency_window=10000):
+        """
+        :param int latency_window: Number of most recent request latencies that percentiles are computed over.
+        """
+        self.start_time = time.monotonic()
+        self.requests, self.errors, self.predictions, self.batches = 0, 0, 0, 0
+        self._latencies = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+
+    def record_request(self, seconds, num_predictions):
+        with self._lock:
+            self.requests += 1
+            self.predictions += num_predictions
+            self._latencies.append(seconds)
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def record_batch(self):
+        with self._lock:
+            self.batches += 1
+
+    def snapshot(self):
+        """
+        :return: Counts, throughput since the service started, mean batch size, and latency percentiles in ms.
+        :rtype: dict
+        """
+        with self._lock:
+            uptime = time.monotonic() - self.start_time
+            latencies = np.array(self._latencies)
+            metrics = {
+                'uptime_seconds': uptime,
+                'requests': self.requests,
+                'errors': self.errors,
+                'predictions': self.predictions,
+                'batches': self.batches,
+                'requests_per_second': self.requests / uptime if uptime > 0 else 0.0,
+                'predictions_per_second': self.predictions / uptime if uptime > 0 else 0.0,
+                'mean_batch_requests': self.requests / self.batches if self.batches else 0.0
+            }
+
+        for percentile in (50, 90, 99):
+            metrics[f'latency_p{percentile}_ms'] = \
+                float(np.percentile(latencies, percentile)) * 1000 if len(latencies) else None
+
+        return metrics
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent prediction requests into batches. A worker thread takes the first waiting request, then keeps
+    collecting requests until the batch holds `max_batch_size` rows or `max_wait` seconds have passed, and scores the
+    whole batch with one call to `predict`.
+    """
+
+    def __init__(self, predict, max_batch_size=1024, max_wait=0.002, metrics=None):
+        """
+        :param callable predict: Function that takes a 2-D array of raw inputs (one row per track, columns in
+                                 REQUEST_FIELDS order) and returns one prediction per row.
+        :param int max_batch_size: Maximum number of rows per batch. A single request larger than this is scored as a
+                                   batch of its own.
+        :param float max_wait: Maximum seconds to wait for more requests after the first request of a batch arrives.
+        :param ServiceMetrics metrics: Metrics to record batches in.
+        """
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.metrics = metrics
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, inputs):
+        """
+        Queues rows to be scored in the next batch.
+
+        :param numpy.ndarray inputs: Raw inputs, one row per track, columns in REQUEST_FIELDS order.
+        :return: Future resolving to the predictions for the rows.
+        :rtype: concurrent.futures.Future
+        """
+        future = Future()
+        self._queue.put((inputs, future))
+
+        return future
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch, num_rows = [item], len(item[0])
+            deadline = time.monotonic() + self.max_wait
+            while num_rows < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    # finish this batch, then stop
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+                num_rows += len(item[0])
+
+            self._predict_batch(batch)
+
+    def _predict_batch(self, batch):
+        try:
+            predictions = self.predict(np.concatenate([inputs for inputs, _ in batch]))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        if self.metrics is not None:
+            self.metrics.record_batch()
+        start = 0
+        for inputs, future in batch:
+            future.set_result(predictions[start:start + len(inputs)])
+            start += len(inputs)
+
+    def close(self):
+        """
+        Scores the requests already queued, then stops the worker thread.
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+
+def parse_instances(payload):
+    """
+    Converts a prediction request into raw model inputs.
+
+    :param dict payload: A single instance (a dictionary with every field in REQUEST_FIELDS), or a dictionary with a
+                         list of instances under 'instances'. Mode may be 1/0 or a label such as 'Major Key'.
+    :return: Raw inputs with one row per instance, and whether the request held a single instance.
+    :rtype: tuple
+    """
+    if not isinstance(payload, dict):
+        raise ValueError('Request body must be a JSON object.')
+    single = 'instances' not in payload
+    instances = [payload] if single else payload['instances']
+    if not isinstance(instances, list) or not instances:
+        raise ValueError("'instances' must be a non-empty list.")
+
+    columns = []
+    for field in REQUEST_FIELDS:
+        try:
+            values = [instance[field] for instance in instances]
+        except (KeyError, TypeError):
+            raise ValueError(f"Every instance must have a '{field}' field.")
+        try:
+            columns.append(encode_mode(values) if field == 'mode' else np.asarray(values, dtype=np.float64))
+        except (TypeError, ValueError):
+            raise ValueError(f"'{field}' must be a number.")
+
+    inputs = np.column_stack(columns)
+    if not np.isfinite(inputs).all():
+        raise ValueError('Every field must be a finite number.')
+    if (inputs[:, REQUEST_FIELDS.index('followers')] <= 0).any():
+        raise ValueError("'followers' must be positive.")
+
+    return inputs, single
+
+
+def _make_handler(batcher, metrics):
+    class Handler(BaseHTTPRequestHandler):
+        # keep connections alive, so clients don't pay for a new connection per prediction
+        protocol_version = 'HTTP/1.1'
+        # headers and body go out in separate writes. with Nagle's algorithm on, the body waits for the client's
+        # delayed ACK of the headers, adding ~40 ms to every response, which the service's own latency doesn't include
+        disable_nagle_algorithm = True
+
+        def _send_json(self, status, body):
+            body = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/metrics':
+                self._send_json(200, metrics.snapshot())
+            elif self.path == '/health':
+                self._send_json(200, {'status': 'ok'})
+            else:
+                self._send_json(404, {'error': 'Not found.'})
+
+        def do_POST(self):
+            start = time.perf_counter()
+            if self.path != '/predict':
+                self._send_json(404, {'error': 'Not found.'})
+                return
+
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+            except ValueError:
+                length = -1
+            if not 0 <= length <= MAX_BODY_BYTES:
+                # the body is left unread, so it would be parsed as the next request on this keep-alive connection
+                self.close_connection = True
+                metrics.record_error()
+                error = 'Request body is too large.' if length > MAX_BODY_BYTES else 'Invalid Content-Length.'
+                self._send_json(400, {'error': error})
+                return
+
+            try:
+                inputs, single = parse_instances(json.loads(self.rfile.read(length)))
+            except ValueError as e:
+                # json.JSONDecodeError is a ValueError too
+                metrics.record_error()
+                self._send_json(400, {'error': str(e)})
+                return
+
+            try:
+                predictions = batcher.submit(inputs).result()
+            except Exception as e:
+                metrics.record_error()
+                self._send_json(500, {'error': f'Prediction failed: {e}'})
+                return
+
+            self._send_json(200, {'popularity': float(predictions[0]) if single else predictions.tolist()})
+            metrics.record_request(time.perf_counter() - start, len(inputs))
+
+        def log_message(self, format, *args):
+            # logging every request would dominate the cost of serving it
+            pass
+
+    return Handler
+
+
+class _PredictionHTTPServer(ThreadingHTTPServer):
+    # socketserver's default listen backlog of 5 overflows when many clients connect at once, and the kernel then
+    # resets their connections
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class PredictionService:
+    """
+    HTTP prediction service. Loads the model once, and scores all requests through a shared `MicroBatcher`.
+    """
+
+    def __init__(self, model=None, host='127.0.0.1', port=8000, max_batch_size=1024, max_wait=0.002):
+        """
+        :param object model: Fitted model with a `predict` method. Defaults to the exported coefficients of
+                             `data/final_model.pkl`.
+        :param str host: Interface to listen on.
+        :param int port: Port to listen on. 0 picks a free port.
+        :param int max_batch_size: Maximum number of rows per micro-batch.
+        :param float max_wait: Maximum seconds a micro-batch waits for more requests.
+        """
+        self.model = model if model is not None else load_popularity_model()
+        self.metrics = ServiceMetrics()
+        self.batcher = MicroBatcher(lambda inputs: self.model.predict(build_feature_matrix(*inputs.T)),
+                                    max_batch_size=max_batch_size, max_wait=max_wait, metrics=self.metrics)
+        self._server = _PredictionHTTPServer((host, port), _make_handler(self.batcher, self.metrics))
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        :return: Root URL of the service, e.g. 'http://127.0.0.1:8000'.
+        :rtype: str
+        """
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def serve_forever(self):
+        """
+        Serves requests in the calling thread until `stop` is called (from another thread).
+        """
+        self._server.serve_forever()
+
+    def start(self):
+        """
+        Starts serving in a background thread.
+
+        :return: Root URL of the service.
+        :rtype: str
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+        return self.url
+
+    def stop(self):
+        """
+        Stops serving, closes the listening socket and stops the batcher.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        self.batcher.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv=None):
+    """
+    Command line entry point for the prediction service. Run `python prediction_service.py --help` for usage.
+
+    :param list argv: Command line arguments. Defaults to `sys.argv[1:]`.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serve popularity predictions over HTTP.')
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH,
+                        help='Path to the exported coefficients file or pickled model.')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on.')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on.')
+    parser.add_argument('--max-batch-size', type=int, default=1024, help='Maximum number of rows per micro-batch.')
+    parser.add_argument('--max-wait-ms', type=float, default=2.0,
+                        help='Maximum milliseconds a micro-batch waits for more requests.')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    service = PredictionService(load_popularity_model(args.model), host=args.host, port=args.port,
+                                max_batch_size=args.max_batch_size, max_wait=args.max_wait_ms / 1000)
+    print(f'Serving predictions on {service.url}/predict (metrics on {service.url}/metrics). Press Ctrl+C to stop.')
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        print(json.dumps(service.metrics.snapshot(), indent=2))
@@ -0,0 +1,246 @@
+"""
+Contains an on-disk cache for Pitchfork pages and Spotify API responses used by the data acquisition pipeline, so that
+rebuilding the dataset only goes to the network for data that isn't cached yet (or has expired).
+"""
+import os
+import json
+import time
+import pickle
+import hashlib
+import threading
+
+from utilities.instrumentation import outbound_call
+
+
+DAY = 24 * 60 * 60
+
+# how long responses from each endpoint stay fresh, in seconds. reviews and audio features practically never change,
+# while popularity and follower counts drift daily.
+DEFAULT_TTLS = {
+    'pitchfork_review': 365 * DAY,
+    'spotify_search': 30 * DAY,
+    'spotify_artist_search': 30 * DAY,
+    'spotify_artist_albums': 30 * DAY,
+    'spotify_album_tracks': 90 * DAY,
+    'spotify_albums': 90 * DAY,
+    'spotify_audio_features': 365 * DAY,
+    'spotify_tracks': 1 * DAY,
+    'spotify_artists': 1 * DAY
+}
+
+
+class ResponseCache:
+    """
+    Content-addressed cache of responses stored as pickle files under `cache_dir/<endpoint>/`. Each entry is addressed
+    by a SHA-256 digest of the endpoint and the arguments of the request, expires after its endpoint's TTL, and the
+    least recently used entries are evicted once the cache grows past `max_size_bytes`. Safe to share between threads.
+    """
+
+    def __init__(self, cache_dir, ttls=None, default_ttl=30 * DAY, max_size_bytes=1 << 30):
+        """
+        :param str cache_dir: Directory to store cached responses in. Created if it doesn't exist.
+        :param dict ttls: Seconds until entries expire, by endpoint. Overrides DEFAULT_TTLS.
+        :param float default_ttl: Seconds until entries of endpoints not in `ttls` or DEFAULT_TTLS expire.
+        :param int max_size_bytes: Maximum total size of cached files before least recently used ones are evicted.
+        """
+        self.cache_dir = cache_dir
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.default_ttl = default_ttl
+        self.max_size_bytes = max_size_bytes
+        self.hits, self.misses = {}, {}
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._size_bytes = sum(size for _, _, size in self._entries())
+
+    @staticmethod
+    def make_key(endpoint, *args):
+        """
+        Computes the address of a request.
+
+        :param str endpoint: Name of the endpoint, e.g. 'spotify_search'.
+        :param args: JSON-serializable arguments that identify the request.
+        :return: Hex digest addressing the request.
+        :rtype: str
+        """
+        return hashlib.sha256(json.dumps([endpoint, args], sort_keys=True, default=str).encode()).hexdigest()
+
+    def _path(self, endpoint, key):
+        return os.path.join(self.cache_dir, endpoint, key[:2], f'{key}.pkl')
+
+    def _entries(self):
+        """
+        :return: (path, last access time, size in bytes) of every cached file.
+        :rtype: generator
+        """
+        for directory, _, file_names in os.walk(self.cache_dir):
+            for file_name in file_names:
+                if file_name.endswith('.pkl'):
+                    path = os.path.join(directory, file_name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, stat.st_mtime, stat.st_size
+
+    def _record(self, counter, endpoint):
+        with self._lock:
+            counter[endpoint] = counter.get(endpoint, 0) + 1
+
+    def contains(self, endpoint, *key_args):
+        """
+        Checks whether a request has a cached entry, without counting it as a hit or a miss or checking its TTL. An
+        expired entry counts as cached here, but is refetched by `get_or_fetch`, so don't use this to decide whether a
+        request will go to the network.
+
+        :param str endpoint: Name of the endpoint.
+        :param key_args: JSON-serializable arguments that identify the request.
+        :return: Whether the request is cached.
+        :rtype: bool
+        """
+        return os.path.exists(self._path(endpoint, self.make_key(endpoint, *key_args)))
+
+    def get(self, endpoint, key):
+        """
+        Looks up a cached response.
+
+        :param str endpoint: Name of the endpoint.
+        :param str key: Address of the request, see `make_key`.
+        :return: Whether there was a fresh cached response, and the response (None if there wasn't).
+        :rtype: tuple
+        """
+        path = self._path(endpoint, key)
+        try:
+            with open(path, 'rb') as f:
+                created, value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self._record(self.misses, endpoint)
+            return False, None
+
+        if time.time() - created > self.ttls.get(endpoint, self.default_ttl):
+            self._remove(path)
+            self._record(self.misses, endpoint)
+            return False, None
+
+        # mark as recently used for LRU eviction
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self._record(self.hits, endpoint)
+
+        return True, value
+
+    def set(self, endpoint, key, value):
+        """
+        Stores a response, evicting least recently used entries if the cache grows too large.
+
+        :param str endpoint: Name of the endpoint.
+        :param str key: Address of the request, see `make_key`.
+        :param value: Picklable response.
+        """
+        path = self._path(endpoint, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # write to a temporary file first so readers never see a partially written entry
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as f:
+            pickle.dump((time.time(), value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        size = os.path.getsize(temp_path)
+        previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(temp_path, path)
+
+        with self._lock:
+            self._size_bytes += size - previous_size
+            over_capacity = self._size_bytes > self.max_size_bytes
+        if over_capacity:
+            self.evict()
+
+    def get_or_fetch(self, endpoint, key_args, fetch):
+        """
+        Returns the cached response for a request, or calls `fetch` and caches its result on a miss.
+
+        :param str endpoint: Name of the endpoint.
+        :param tuple key_args: JSON-serializable arguments that identify the request.
+        :param callable fetch: Function without arguments that makes the request.
+        :return: Response.
+        """
+        key = self.make_key(endpoint, *key_args)
+        hit, value = self.get(endpoint, key)
+        if not hit:
+            value = fetch()
+            self.set(endpoint, key, value)
+
+        return value
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._size_bytes -= size
+
+    def evict(self, target_fraction=0.9):
+        """
+        Removes least recently used entries until the cache is below `target_fraction` of its maximum size. Evicting
+        below the maximum leaves headroom, so that the cache directory isn't rescanned on every subsequent write.
+
+        :param float target_fraction: Fraction of `max_size_bytes` to shrink the cache to.
+        """
+        target_size = self.max_size_bytes * target_fraction
+        for path, _, _ in sorted(self._entries(), key=lambda entry: entry[1]):
+            if self._size_bytes <= target_size:
+                break
+            self._remove(path)
+
+    def clear(self):
+        """
+        Removes every cached entry and resets the hit/miss counters.
+        """
+        for path, _, _ in list(self._entries()):
+            self._remove(path)
+        with self._lock:
+            self.hits, self.misses = {}, {}
+
+    @property
+    def size_bytes(self):
+        return self._size_bytes
+
+    def stats(self):
+        """
+        :return: Hits, misses and hit rate per endpoint, plus totals under the 'total' key.
+        :rtype: dict
+        """
+        with self._lock:
+            endpoints = sorted(set(self.hits) | set(self.misses))
+            stats = {endpoint: {'hits': self.hits.get(endpoint, 0), 'misses': self.misses.get(endpoint, 0)}
+                     for endpoint in endpoints}
+        stats['total'] = {'hits': sum(s['hits'] for s in stats.values()),
+                          'misses': sum(s['misses'] for s in stats.values())}
+        for endpoint_stats in stats.values():
+            lookups = endpoint_stats['hits'] + endpoint_stats['misses']
+            endpoint_stats['hit_rate'] = endpoint_stats['hits'] / lookups if lookups else 0.0
+
+        return stats
+
+
+def cached_call(cache, endpoint, key_args, fetch):
+    """
+    Calls `fetch` through `cache`, or directly if no cache is given. Calls that reach `fetch` (i.e. cache misses) are
+    counted and timed per endpoint as outbound calls.
+
+    :param ResponseCache cache: Response cache, or None.
+    :param str endpoint: Name of the endpoint.
+    :param tuple key_args: JSON-serializable arguments that identify the request.
+    :param callable fetch: Function without arguments that makes the request.
+    :return: Response.
+    """
+    def counted_fetch():
+        return outbound_call(endpoint, fetch)
+
+    if cache is None:
+        return counted_fetch()
+
+    return cache.get_or_fetch(endpoint, key_args, counted_fetch)
@@ -0,0 +1,323 @@
+"""
+Contains utility functions necessary to turn raw track data into model features and score it with the trained
+popularity model, either a single row at a time (`app.py`) or in bounded-memory batches over large files.
+"""
+import os
+import sys
+import time
+import functools
+import numpy as np
+
+from utilities.model_registry import MODEL_REGISTRY, load_model
+from utilities.linear_scorer import LinearScorer
+from utilities.instrumentation import export_metrics, timed
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+DEFAULT_MODEL_PATH = os.path.join(DATA_DIR, 'final_model_coefficients.json')
+
+# column order the model was trained on
+MODEL_FEATURES = ['Mode', 'Danceability', 'Energy', 'Speechiness', 'Valence', 'Log Artist Followers']
+
+# raw input columns expected by batch scoring, in the same order as MODEL_FEATURES
+INPUT_COLUMNS = ['Mode', 'Danceability', 'Energy', 'Speechiness', 'Valence', 'Artist Followers']
+
+PREDICTION_COLUMN = 'Predicted Popularity'
+
+# inputs of `build_feature_matrix` that what-if curves are computed for, in argument order, with the ranges of their
+# sliders in app.py
+WHAT_IF_INPUTS = ['mode', 'danceability', 'energy', 'speechiness', 'valence', 'followers']
+WHAT_IF_RANGES = {
+    'mode': (0, 1),
+    'danceability': (0.0, 1.0),
+    'energy': (0.0, 1.0),
+    'speechiness': (0.0, 1.0),
+    'valence': (0.0, 1.0),
+    'followers': (1000, 1000000)
+}
+
+
+@timed
+def load_popularity_model(path=DEFAULT_MODEL_PATH):
+    """
+    Loads the popularity model through the process-wide model registry. Exported coefficient files (.json) are loaded
+    as a pure-NumPy `LinearScorer`; anything else is treated as a pickled scikit-learn model.
+
+    :param str path: Path to a .json coefficients file or a pickled model.
+    :return: Model with a `predict` method.
+    :rtype: object
+    """
+    return load_model(path, loader=LinearScorer.load if path.endswith('.json') else None)
+
+
+def encode_mode(mode):
+    """
+    Encodes mode as 1 (major) or 0 (minor). Accepts numeric Spotify modes, or labels such as 'Major Key'/'Minor Key'.
+
+    :param mode: Scalar, list, numpy array or pandas Series of modes.
+    :return: Encoded modes.
+    :rtype: numpy.ndarray
+    """
+    mode = np.asarray(mode)
+    if mode.dtype.kind in 'OUS':
+        return np.char.startswith(np.char.lower(mode.astype(str)), 'major').astype(np.float64)
+
+    return (mode == 1).astype(np.float64)
+
+
+def build_feature_matrix(mode, danceability, energy, speechiness, valence, followers):
+    """
+    Builds the model's feature matrix with columns [mode, danceability, energy, speechiness, valence, log_followers].
+    Every argument may be a scalar or a 1-D array-like of equal length; the computation is fully vectorized.
+
+    :param mode: Track mode(s). See `encode_mode`.
+    :param danceability: Danceability value(s) between 0 and 1.
+    :param energy: Energy value(s) between 0 and 1.
+    :param speechiness: Speechiness value(s) between 0 and 1.
+    :param valence: Valence value(s) between 0 and 1.
+    :param followers: Number(s) of Spotify followers of the track's artist.
+    :return: Feature matrix of shape (n_rows, 6).
+    :rtype: numpy.ndarray
+    """
+    columns = [
+        encode_mode(mode),
+        np.asarray(danceability, dtype=np.float64),
+        np.asarray(energy, dtype=np.float64),
+        np.asarray(speechiness, dtype=np.float64),
+        np.asarray(valence, dtype=np.float64),
+        np.log(np.asarray(followers, dtype=np.float64))
+    ]
+    columns = np.broadcast_arrays(*[np.atleast_1d(column) for column in columns])
+
+    return np.column_stack(columns)
+
+
+def build_feature_matrix_from_frame(df, input_columns=INPUT_COLUMNS):
+    """
+    Builds the model's feature matrix from a DataFrame of raw track data.
+
+    :param pandas.DataFrame df: Raw track data.
+    :param list input_columns: Names of the mode, danceability, energy, speechiness, valence and artist follower
+                               columns, in that order.
+    :return: Feature matrix of shape (len(df), 6).
+    :rtype: numpy.ndarray
+    """
+    return build_feature_matrix(*(df[column].values for column in input_columns))
+
+
+def what_if_grid(name, num_points=50):
+    """
+    :param str name: One of WHAT_IF_INPUTS.
+    :param int num_points: Number of points for continuous inputs.
+    :return: Values an input is swept over for its what-if curve. Followers are spaced logarithmically, since the
+             model uses their log, and mode only takes its two values.
+    :rtype: numpy.ndarray
+    """
+    low, high = WHAT_IF_RANGES[name]
+    if name == 'mode':
+        return np.array([low, high], dtype=np.float64)
+    if name == 'followers':
+        return np.geomspace(low, high, num_points)
+
+    return np.linspace(low, high, num_points)
+
+
+@timed
+def what_if_curves(model, mode, danceability, energy, speechiness, valence, followers, num_points=50, decimals=2):
+    """
+    Computes sensitivity curves around a point: for each input, the predicted popularity as that input is swept over
+    its range while the others stay at the point. All points of all curves are scored with a single `predict` call.
+
+    Results are memoized by the point rounded to `decimals` (followers to whole numbers), so returning to a previous
+    setting costs no computation. The returned arrays are shared between calls and read-only.
+
+    :param object model: Fitted model with a `predict` method. Must be hashable, which holds for models loaded through
+                         the model registry.
+    :param mode: Track mode. See `encode_mode`.
+    :param float danceability: Danceability between 0 and 1.
+    :param float energy: Energy between 0 and 1.
+    :param float speechiness: Speechiness between 0 and 1.
+    :param float valence: Valence between 0 and 1.
+    :param int followers: Number of Spotify followers of the track's artist.
+    :param int num_points: Number of points per curve for continuous inputs.
+    :param int decimals: Number of decimals the point is rounded to.
+    :return: Input name mapped to (input values, predicted popularity) arrays, for every input in WHAT_IF_INPUTS.
+    :rtype: dict
+    """
+    point = (float(encode_mode(mode)), round(float(danceability), decimals), round(float(energy), decimals),
+             round(float(speechiness), decimals), round(float(valence), decimals), float(round(followers)))
+
+    return _what_if_curves(model, point, num_points)
+
+
+@functools.lru_cache(maxsize=1024)
+def _what_if_curves(model, point, num_points):
+    """
+    Memoized implementation of `what_if_curves`.
+
+    :param object model: Fitted model with a `predict` method.
+    :param tuple point: Encoded mode and raw values of the other inputs, in WHAT_IF_INPUTS order.
+    :param int num_points: Number of points per curve for continuous inputs.
+    :return: Input name mapped to (input values, predicted popularity) arrays.
+    :rtype: dict
+    """
+    grids = [what_if_grid(name, num_points) for name in WHAT_IF_INPUTS]
+    bounds = np.cumsum([0] + [len(grid) for grid in grids])
+
+    # one row per grid point: the point itself, with one input replaced by its grid value
+    inputs = np.tile(np.asarray(point, dtype=np.float64), (bounds[-1], 1))
+    for i, grid in enumerate(grids):
+        inputs[bounds[i]:bounds[i + 1], i] = grid
+    predictions = model.predict(build_feature_matrix(*inputs.T))
+
+    curves = {}
+    for i, (name, grid) in enumerate(zip(WHAT_IF_INPUTS, grids)):
+        curve = predictions[bounds[i]:bounds[i + 1]].copy()
+        grid.setflags(write=False)
+        curve.setflags(write=False)
+        curves[name] = (grid, curve)
+
+    return curves
+
+
+# the memoized curves hold references to the models they were computed with, so drop them when the registry unloads a
+# model (e.g. reloads a changed model file), rather than keeping old models in memory until 1024 newer curves evict them
+MODEL_REGISTRY.add_unload_callback(_what_if_curves.cache_clear)
+
+
+def _read_chunks(input_path, chunk_size, columns):
+    """
+    Streams a CSV or Parquet file in chunks of at most `chunk_size` rows.
+
+    :param str input_path: Path to a .csv or .parquet file.
+    :param int chunk_size: Maximum number of rows per chunk.
+    :param list columns: Columns to read.
+    :return: Generator of pandas DataFrames.
+    :rtype: generator
+    """
+    import pandas as pd
+
+    if input_path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(input_path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        for chunk in pd.read_csv(input_path, chunksize=chunk_size, usecols=columns):
+            yield chunk
+
+
+class _ChunkWriter:
+    """
+    Appends scored chunks to a CSV or Parquet file, so that the output never has to be held in memory.
+    """
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self._parquet_writer = None
+        self._wrote_header = False
+
+    def write(self, df):
+        if self.output_path.endswith('.parquet'):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.output_path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            df.to_csv(self.output_path, mode='a' if self._wrote_header else 'w', header=not self._wrote_header,
+                      index=False)
+            self._wrote_header = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+@timed
+def score_file(input_path, output_path, model=None, chunk_size=100000, input_columns=INPUT_COLUMNS,
+               id_columns=('Track URI',), verbose=True):
+    """
+    Scores every row of a CSV or Parquet file with the popularity model and writes the predictions to another CSV or
+    Parquet file. The input is streamed in chunks of `chunk_size` rows, so memory use is bounded by the chunk size no
+    matter how large the file is.
+
+    :param str input_path: Path to a .csv or .parquet file containing raw track data.
+    :param str output_path: Path to a .csv or .parquet file to write predictions to.
+    :param object model: Fitted model with a `predict` method. Defaults to the exported coefficients of
+                         `data/final_model.pkl`.
+    :param int chunk_size: Number of rows to score at a time.
+    :param list input_columns: Names of the mode, danceability, energy, speechiness, valence and artist follower
+                               columns, in that order.
+    :param tuple id_columns: Columns to copy from the input into the output to identify each prediction. Columns that
+                             aren't present in the input are ignored.
+    :param bool verbose: Whether to print progress after each chunk.
+    :return: Scoring statistics: number of rows, elapsed seconds and rows per second.
+    :rtype: dict
+    """
+    import pandas as pd
+
+    if model is None:
+        model = load_popularity_model()
+
+    # only read the columns needed, plus whichever id columns exist
+    if input_path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        available_columns = pq.ParquetFile(input_path).schema_arrow.names
+    else:
+        available_columns = pd.read_csv(input_path, nrows=0).columns.tolist()
+    id_columns = [column for column in id_columns if column in available_columns]
+    columns = id_columns + [column for column in input_columns if column not in id_columns]
+
+    writer = _ChunkWriter(output_path)
+    num_rows = 0
+    start = time.perf_counter()
+    try:
+        for chunk in _read_chunks(input_path, chunk_size, columns):
+            predictions = model.predict(build_feature_matrix_from_frame(chunk, input_columns))
+            df_scored = chunk[id_columns].copy()
+            df_scored[PREDICTION_COLUMN] = predictions
+            writer.write(df_scored)
+
+            num_rows += len(chunk)
+            if verbose:
+                elapsed = time.perf_counter() - start
+                print(f'Scored {num_rows} rows ({num_rows / elapsed:,.0f} rows/s)...')
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    rows_per_second = num_rows / elapsed if elapsed > 0 else float('inf')
+    if verbose:
+        print(f'Scored {num_rows} rows in {elapsed:.2f}s ({rows_per_second:,.0f} rows/s).')
+
+    return {'rows': num_rows, 'seconds': elapsed, 'rows_per_second': rows_per_second}
+
+
+def main(argv=None):
+    """
+    Command line entry point for batch scoring. Run `python batch_score.py --help` for usage.
+
+    :param list argv: Command line arguments. Defaults to `sys.argv[1:]`.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Score a CSV or Parquet file of tracks with the popularity model.')
+    parser.add_argument('input_path', help='.csv or .parquet file containing raw track data.')
+    parser.add_argument('output_path', help='.csv or .parquet file to write predictions to.')
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH,
+                        help='Path to the exported coefficients file or pickled model.')
+    parser.add_argument('--chunk-size', type=int, default=100000, help='Number of rows to score at a time.')
+    parser.add_argument('--id-columns', nargs='*', default=['Track URI'],
+                        help='Input columns to copy into the output.')
+    parser.add_argument('--quiet', action='store_true', help='Only print the final summary.')
+    parser.add_argument('--metrics', help='.prom or .jsonl file to write timings to. Defaults to '
+                                          '$POPULARITY_METRICS_PATH, if set.')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    stats = score_file(args.input_path, args.output_path, model=load_popularity_model(args.model),
+                       chunk_size=args.chunk_size, id_columns=tuple(args.id_columns), verbose=not args.quiet)
+    if args.quiet:
+        print(f"Scored {stats['rows']} rows in {stats['seconds']:.2f}s ({stats['rows_per_second']:,.0f} rows/s).")
+    export_metrics(args.metrics, source='batch_score')